@@ -5,39 +5,59 @@
 "object programming"
 
 
-from opr import message, handler, objects, runtime, threads
+from opr import message, handler, objects, runtime, storage, threads
 
 
 from opr.message import *
 from opr.handler import *
 from opr.objects import *
 from opr.runtime import *
+from opr.storage import *
 from opr.threads import *
 
 
 def __dir__():
     return (
+            'AsyncHandler',
+            'Bounded',
             'Bus',
+            'Cache',
             'Callback',
             'Cfg',
             'Class',
+            'Codec',
             'Command',
             'Config',
             'Db',
             'Default',
             'Event',
+            'Files',
             'Handler',
+            'Index',
+            'Lazy',
+            'Log',
+            'Manifest',
             'Object',
             'ObjectDecoder',
             'ObjectEncoder',
+            'Output',
             'Parsed',
+            'Pool',
             'Repeater',
+            'Segments',
+            'Sqlite',
+            'Store',
+            'Stripes',
             'Thread',
             'Timer',
             'Wd',
+            'Writer',
             'boot',
             'cdir',
             'command',
+            'compact',
+            'compactor',
+            'cpt',
             'dump',
             'dumps',
             'edit',
@@ -46,6 +66,8 @@ def __dir__():
             'fns',
             'fntime',
             'hook',
+            'ifind',
+            'ifns',
             'include',
             'items',
             'keys',
@@ -57,6 +79,8 @@ def __dir__():
             'loads',
             'locked',
             'match',
+            'mig',
+            'migrate',
             'name',
             'parse',
             'printable',
@@ -73,6 +97,7 @@ def __dir__():
             'handler',
             'objects',
             'runtime',
+            'storage',
             'threads'
            )
 
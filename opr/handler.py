@@ -5,21 +5,27 @@
 "handler"
 
 
+import asyncio
+import collections
+import inspect
 import queue
 import threading
 import time
+import weakref
 
 
-from .objects import Object
-from .threads import launch
+from .objects import Object, Writer
+from .threads import Bounded, Pool, launch
 
 
 def __dir__():
     return (
+            'AsyncHandler',
             'Bus',
             'Callback',
             'Command',
             'Handler',
+            'Output',
            )
 
 
@@ -29,38 +35,142 @@ __all__ = __dir__()
 
 class Bus(Object):
 
-    objs = []
+    """handlers by origin (their repr), an entry goes when its handler dies.
+       output to a handler with a scheduler (Output) goes into its backlog,
+       to a handler with an outbox it is queued for its writer thread,
+       errors raised while writing end up in Bus.errors."""
+
+    errors = []
+    objs = weakref.WeakValueDictionary()
 
     @staticmethod
     def add(obj):
-        if repr(obj) not in [repr(x) for x in Bus.objs]:
-            Bus.objs.append(obj)
+        Bus.objs[repr(obj)] = obj
 
     @staticmethod
     def announce(txt):
-        for obj in Bus.objs:
-            obj.announce(txt)
+        for obj in list(Bus.objs.values()):
+            Bus.send(obj, obj.announce, txt)
 
     @staticmethod
     def byorig(orig):
-        res = None
-        for obj in Bus.objs:
-            if repr(obj) == orig:
-                res = obj
-                break
-        return res
+        return Bus.objs.get(orig, None)
+
+    @staticmethod
+    def remove(obj):
+        Bus.objs.pop(repr(obj), None)
 
     @staticmethod
     def say(orig, channel, txt):
+        Bus.saymany(orig, channel, [txt])
+
+    @staticmethod
+    def saymany(orig, channel, txts):
         bot = Bus.byorig(orig)
-        if bot:
-            bot.say(channel, txt)
+        if not bot or not txts:
+            return
+        if getattr(bot, "output", None):
+            bot.output.put(channel, txts)
+            return
+        func = getattr(bot, "saymany", None)
+        if func:
+            Bus.send(bot, func, channel, list(txts))
+            return
+        for txt in txts:
+            Bus.send(bot, bot.say, channel, txt)
+
+    @staticmethod
+    def send(obj, func, *args):
+        outbox = getattr(obj, "outbox", None)
+        if outbox:
+            return outbox.put((func, args))
+        func(*args)
+        return True
+
+
+class Output:
+
+    """per channel backlog of lines for a handler, drained by a thread at
+       rate lines per second with bursts of up to burst lines (rate 0 is no
+       limit). lines waiting for a channel go out together, at most batch
+       of them per saymany() call, the scheduler waits for the tokens of a
+       full batch rather than sending lines one by one. channels take
+       turns."""
+
+    def __init__(self, hdl, rate=1.0, burst=5, batch=5):
+        self.backlogs = collections.OrderedDict()
+        self.batch = batch
+        self.burst = burst
+        self.closed = False
+        self.cond = threading.Condition()
+        self.hdl = hdl
+        self.rate = rate
+        self.sent = 0
+        self.stamp = time.monotonic()
+        self.tokens = burst
+
+    def backlog(self):
+        with self.cond:
+            return {chan: len(lines) for chan, lines in self.backlogs.items()}
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def loop(self):
+        while 1:
+            with self.cond:
+                self.cond.wait_for(lambda: self.backlogs or self.closed)
+                if not self.backlogs:
+                    break
+                channel, lines = next(iter(self.backlogs.items()))
+                nrs = min(self.batch, len(lines))
+                if self.rate:
+                    now = time.monotonic()
+                    self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                    self.stamp = now
+                    need = max(1, min(nrs, self.burst))
+                    if self.tokens < need:
+                        self.cond.wait((need - self.tokens) / self.rate)
+                        continue
+                    nrs = min(nrs, int(self.tokens))
+                txts = [lines.popleft() for _nr in range(min(nrs, len(lines)))]
+                if self.rate:
+                    self.tokens -= len(txts)
+                if lines:
+                    self.backlogs.move_to_end(channel)
+                else:
+                    del self.backlogs[channel]
+            try:
+                self.hdl.saymany(channel, txts)
+            except Exception as ex:
+                Bus.errors.append(ex)
+            self.sent += len(txts)
+
+    def put(self, channel, txts):
+        with self.cond:
+            self.backlogs.setdefault(channel, collections.deque()).extend(txts)
+            self.cond.notify_all()
+
+    def start(self):
+        thr = threading.Thread(
+                               target=self.loop,
+                               name="%s.output" % self.hdl.__class__.__name__,
+                               daemon=True
+                              )
+        thr.start()
 
 
 class Callback(Object):
 
+    """callbacks run in a thread per event, or on a pool of workers once
+       Callback.pooled() has set one up. events whose callback raised on
+       the pool end up in Callback.errors."""
+
     cbs = Object()
     errors = []
+    pool = None
 
     @staticmethod
     def register(typ, cbs):
@@ -73,6 +183,9 @@ class Callback(Object):
         if not func:
             event.ready()
             return
+        if Callback.pool:
+            Callback.pool.put(Callback.run, func, event)
+            return
         event.__thr__ = launch(func, event)
 
     @staticmethod
@@ -83,6 +196,23 @@ class Callback(Object):
     def get(typ):
         return getattr(Callback.cbs, typ)
 
+    @staticmethod
+    def pooled(workers=4, limit=0):
+        old = Callback.pool
+        Callback.pool = workers and Pool(workers, limit, "Callback") or None
+        if old:
+            old.stop()
+
+    @staticmethod
+    def run(func, event):
+        try:
+            func(event)
+        except Exception as ex:
+            event.__exc__ = ex.with_traceback(ex.__traceback__)
+            Callback.errors.append(event)
+        finally:
+            event.ready()
+
 
 class Command(Object):
 
@@ -123,9 +253,13 @@ class Handler(Callback):
 
     def __init__(self):
         Callback.__init__(self)
-        self.queue = queue.Queue()
+        self.busy = ""
+        self.outbox = None
+        self.output = None
+        self.queue = Bounded()
         self.stopped = threading.Event()
         self.stopped.clear()
+        self.writer = False
         self.register("event", Command.handle)
         Bus.add(self)
 
@@ -136,9 +270,49 @@ class Handler(Callback):
     def announce(self, txt):
         self.raw(txt)
 
+    def bound(self, maxsize=0, policy="block", busy="busy, try again later"):
+        """bound the event queue, policy is block, oldest or newest (see
+           Bounded) or reject, which drops new events with a busy reply."""
+        self.busy = policy == "reject" and busy or ""
+        self.queue.configure(
+                             maxsize,
+                             policy == "reject" and "newest" or policy,
+                             self.dropped
+                            )
+
+    def dropped(self, event):
+        if self.busy:
+            event.reply(self.busy)
+            event.show()
+        event.ready()
+
+    @staticmethod
+    def drainbox(outbox):
+        while 1:
+            job = outbox.get()
+            if job is None:
+                break
+            func, args = job
+            try:
+                func(*args)
+            except Exception as ex:
+                Bus.errors.append(ex)
+
     def handle(self, event):
         Callback.dispatch(event)
 
+    def outqueue(self, maxsize=0, policy="block"):
+        if self.outbox:
+            self.outbox.close()
+        self.outbox = Bounded(maxsize, policy)
+        thr = threading.Thread(
+                               target=Handler.drainbox,
+                               args=(self.outbox,),
+                               name="%s.output" % self.__class__.__name__,
+                               daemon=True
+                              )
+        thr.start()
+
     def loop(self):
         while not self.stopped.set():
             self.handle(self.poll())
@@ -147,7 +321,7 @@ class Handler(Callback):
         return self.queue.get()
 
     def put(self, event):
-        self.queue.put_nowait(event)
+        self.queue.put(event)
 
     def raw(self, txt):
         raise NotImplementedError("raw")
@@ -159,13 +333,156 @@ class Handler(Callback):
     def say(self, channel, txt):
         self.raw(txt)
 
+    def saymany(self, channel, txts):
+        for txt in txts:
+            self.say(channel, txt)
+
+    def stats(self):
+        return self.queue.stats()
+
     def stop(self):
         self.stopped.set()
+        if self.writer:
+            Writer.stop(self)
+        if self.outbox:
+            self.outbox.close()
+        if self.output:
+            self.output.close()
 
     def start(self):
         self.stopped.clear()
+        if self.writer:
+            Writer.start(self)
+        if self.outbox and self.outbox.closed:
+            self.outqueue(self.outbox.maxsize, self.outbox.policy)
+        if self.output and self.output.closed:
+            self.throttle(self.output.rate, self.output.burst, self.output.batch)
         self.loop()
 
+    def throttle(self, rate=1.0, burst=5, batch=5):
+        if self.output:
+            self.output.close()
+        self.output = Output(self, rate, burst, batch)
+        self.output.start()
+
     def wait(self):
         while 1:
             time.sleep(1.0)
+
+    def writebehind(self):
+        self.writer = True
+        Writer.start(self)
+
+
+class AsyncHandler(Handler):
+
+    """handler running an asyncio loop, command functions that are async def
+       are awaited on the loop and plain ones run in its executor, so events
+       in flight don't each need a thread. events wait in the handler queue,
+       with the queue bounded at most maxsize of them are in flight."""
+
+    def __init__(self):
+        Handler.__init__(self)
+        self.aio = None
+        self.alock = threading.Lock()
+        self.stopper = None
+        self.stopping = False
+        self.tasks = set()
+
+    async def command(self, evt):
+        if not evt.isparsed:
+            evt.parse()
+        func = Command.get(evt.cmd)
+        if func:
+            try:
+                if inspect.iscoroutinefunction(func):
+                    await func(evt)
+                else:
+                    await asyncio.get_running_loop().run_in_executor(None, func, evt)
+            except Exception as ex:
+                evt.__exc__ = ex.with_traceback(ex.__traceback__)
+                Command.errors.append(evt)
+                evt.ready()
+                return
+            evt.show()
+        evt.ready()
+
+    async def dispatch(self, event):
+        func = getattr(Callback.cbs, event.type, None)
+        if func is Command.handle:
+            await self.command(event)
+            return
+        try:
+            if inspect.iscoroutinefunction(func):
+                await func(event)
+            elif func:
+                await asyncio.get_running_loop().run_in_executor(None, func, event)
+        except Exception as ex:
+            event.__exc__ = ex.with_traceback(ex.__traceback__)
+            Callback.errors.append(event)
+        finally:
+            event.ready()
+
+    def drain(self):
+        while not self.queue.maxsize or len(self.tasks) < self.queue.maxsize:
+            try:
+                event = self.queue.get(0)
+            except queue.Empty:
+                break
+            self.spawn(event)
+
+    def finished(self, task):
+        self.tasks.discard(task)
+        if self.aio:
+            self.drain()
+
+    def handle(self, event):
+        try:
+            aio = asyncio.get_running_loop()
+        except RuntimeError:
+            aio = None
+        if aio and aio is self.aio:
+            self.spawn(event)
+        elif self.aio:
+            self.put(event)
+        else:
+            launch(self.run, event)
+
+    def run(self, event):
+        asyncio.run(self.dispatch(event))
+
+    def spawn(self, event):
+        task = asyncio.get_running_loop().create_task(self.dispatch(event))
+        self.tasks.add(task)
+        task.add_done_callback(self.finished)
+
+    def loop(self):
+        asyncio.run(self.main())
+
+    async def main(self):
+        self.stopper = asyncio.Event()
+        with self.alock:
+            self.aio = asyncio.get_running_loop()
+            if self.stopping:
+                self.stopping = False
+                self.stopper.set()
+            self.drain()
+        await self.stopper.wait()
+        with self.alock:
+            self.aio = None
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def put(self, event):
+        Handler.put(self, event)
+        with self.alock:
+            if self.aio:
+                self.aio.call_soon_threadsafe(self.drain)
+
+    def stop(self):
+        Handler.stop(self)
+        with self.alock:
+            if self.aio:
+                self.aio.call_soon_threadsafe(self.stopper.set)
+            else:
+                self.stopping = True
@@ -5,8 +5,10 @@
 "message"
 
 
+import asyncio
 import threading
 import time
+import _thread
 
 
 from .objects import Class, Default, register
@@ -21,52 +23,45 @@ def __dir__():
             )
 
 
+readylock = _thread.allocate_lock()
+
+
 class Parsed(Default):
 
+    "args, gets, sets and toskip only get allocated when first used"
+
     def __init__(self):
         Default.__init__(self)
-        self.args = []
-        self.gets = Default()
         self.isparsed = False
-        self.sets = Default()
-        self.toskip = Default()
         self.txt = ""
 
+    def __getattr__(self, key):
+        if key in ("gets", "sets", "toskip"):
+            val = self.__dict__[key] = Default()
+            return val
+        if key == "args":
+            val = self.__dict__[key] = []
+            return val
+        return Default.__getattr__(self, key)
+
     def parse(self, txt=None):
         self.isparsed = True
         self.otxt = txt or self.txt
-        spl = self.otxt.split()
-        args = []
-        _nr = -1
-        for word in spl:
-            if word.startswith("-"):
-                try:
-                    self.index = int(word[1:])
-                except ValueError:
-                    self.opts = self.opts + word[1:2]
-                continue
-            try:
-                key, value = word.split("==")
-                if value.endswith("-"):
-                    value = value[:-1]
-                    register(self.toskip, value, "")
-                register(self.gets, key, value)
-                continue
-            except ValueError:
-                pass
-            try:
-                key, value = word.split("=")
-                register(self.sets, key, value)
-                continue
-            except ValueError:
-                pass
-            _nr += 1
-            if _nr == 0:
-                self.cmd = word
-                continue
-            args.append(word)
+        index, opts, gets, toskip, sets, cmd, args = tokens(self.otxt)
+        if index is not None:
+            self.index = index
+        if opts is not None:
+            self.opts = self.opts + opts
+        for value in toskip:
+            register(self.toskip, value, "")
+        for key, value in gets:
+            register(self.gets, key, value)
+        for key, value in sets:
+            register(self.sets, key, value)
+        if cmd is not None:
+            self.cmd = cmd
         if args:
-            self.args = args
+            self.args = list(args)
             self.rest = " ".join(args)
             self.txt = self.cmd + " " + self.rest
         else:
@@ -76,18 +71,98 @@ class Parsed(Default):
 Class.add(Parsed)
 
 
+def tokenize(txt):
+    index = None
+    opts = None
+    gets = []
+    toskip = []
+    sets = []
+    cmd = None
+    args = []
+    for word in txt.split():
+        if word[0] == "-":
+            nrs = word[1:]
+            if nrs.isdecimal():
+                index = int(nrs)
+                continue
+            if nrs[:1] in ("-", "+") or "_" in nrs:
+                try:
+                    index = int(nrs)
+                    continue
+                except ValueError:
+                    pass
+            opts = (opts or "") + nrs[:1]
+            continue
+        if "=" in word:
+            nrs = word.count("==")
+            if nrs == 1:
+                key, _sep, value = word.partition("==")
+                if value.endswith("-"):
+                    value = value[:-1]
+                    toskip.append(value)
+                gets.append((key, value))
+                continue
+            if not nrs and word.count("=") == 1:
+                key, _sep, value = word.partition("=")
+                sets.append((key, value))
+                continue
+        if cmd is None:
+            cmd = word
+            continue
+        args.append(word)
+    return (index, opts, tuple(gets), tuple(toskip), tuple(sets), cmd, tuple(args))
+
+
+def tokens(txt):
+    res = tokens.cache.get(txt, None)
+    if res is None:
+        res = tokenize(txt)
+        if len(tokens.cache) >= tokens.max:
+            tokens.cache.clear()
+        tokens.cache[txt] = res
+    return res
+
+
+tokens.cache = {}
+tokens.max = 1000
+
+
 class Event(Parsed):
 
+    """ready() only marks the event done, the threading.Event a wait() blocks
+       on is allocated when a waiter comes before ready(). await event waits
+       for ready() on a future of the running loop."""
+
+    __slots__ = ("__done__", "__futs__", "__ready__", "__thr__")
 
     def __init__(self):
         Parsed.__init__(self)
-        self.__ready__ = threading.Event()
+        self.__done__ = False
+        self.__futs__ = None
+        self.__ready__ = None
         self.__thr__ = None
         self.control = "!"
         self.createtime = time.time()
-        self.result = []
         self.type = "event"
 
+    def __await__(self):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        with readylock:
+            if self.__done__:
+                fut.set_result(self)
+            else:
+                if self.__futs__ is None:
+                    self.__futs__ = []
+                self.__futs__.append((loop, fut))
+        return fut.__await__()
+
+    def __getattr__(self, key):
+        if key == "result":
+            val = self.__dict__[key] = []
+            return val
+        return Parsed.__getattr__(self, key)
+
     def bot(self):
         return Bus.byorig(self.orig)
 
@@ -104,19 +179,39 @@ class Event(Parsed):
         Bus.say(self.orig, self.channel, text)
 
     def ready(self):
-        self.__ready__.set()
+        with readylock:
+            self.__done__ = True
+            evt = self.__ready__
+            futs, self.__futs__ = self.__futs__, None
+        if evt:
+            evt.set()
+        for loop, fut in futs or ():
+            try:
+                loop.call_soon_threadsafe(wake, fut, self)
+            except RuntimeError:
+                pass
 
     def reply(self, txt):
         self.result.append(txt)
 
     def show(self):
-        for txt in self.result:
-            Bus.say(self.orig, self.channel, txt)
+        Bus.saymany(self.orig, self.channel, self.result)
 
     def wait(self):
         if self.__thr__:
             self.__thr__.join()
-        self.__ready__.wait()
+        with readylock:
+            if self.__done__:
+                return
+            if not self.__ready__:
+                self.__ready__ = threading.Event()
+            evt = self.__ready__
+        evt.wait()
 
 
 Class.add(Event)
+
+
+def wake(fut, event):
+    if not fut.done():
+        fut.set_result(event)
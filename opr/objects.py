@@ -1,5 +1,5 @@
 # This file is placed in the Public Domain.
-# pylint: disable=C0112,C0115,C0116,W0613,W0108,R0903
+# pylint: disable=C0112,C0115,C0116,W0613,W0108,R0903,W0703,R1732
 
 
 """objects
@@ -45,10 +45,18 @@ great for giving objects peristence by having their state stored in files.
 """
 
 
+import bisect
+import collections
+import concurrent.futures
+import copy
 import datetime
+import heapq
+import itertools
 import json
+import marshal
 import os
 import pathlib
+import threading
 import time
 import uuid
 import _thread
@@ -56,13 +64,22 @@ import _thread
 
 def __dir__():
     return (
+            'Cache',
             'Class',
+            'Codec',
             'Db',
             'Default',
+            'Files',
+            'Index',
+            'Lazy',
+            'Manifest',
             'Object',
             'ObjectDecoder',
             'ObjectEncoder',
+            'Store',
+            'Stripes',
             'Wd',
+            'Writer',
             'cdir',
             'dump',
             'dumps',
@@ -71,6 +88,8 @@ def __dir__():
             'fns',
             'fntime',
             'hook',
+            'ifind',
+            'ifns',
             'items',
             'keys',
             'kind',
@@ -117,6 +136,17 @@ def locked(lock):
 disklock = _thread.allocate_lock()
 
 
+class Stripes:
+
+    "fixed set of locks, a key always gets the same lock"
+
+    def __init__(self, nrs=64):
+        self.locks = [_thread.allocate_lock() for _ in range(nrs)]
+
+    def get(self, key):
+        return self.locks[hash(key) % len(self.locks)]
+
+
 class Object:
 
 
@@ -125,11 +155,6 @@ class Object:
 
     def __init__(self, *args, **kwargs):
         object.__init__(self)
-        self.__fnm__ = os.path.join(
-            kind(self),
-            str(uuid.uuid4().hex),
-            os.sep.join(str(datetime.datetime.now()).split()),
-        )
         if args:
             val = args[0]
             if isinstance(val, list):
@@ -146,6 +171,16 @@ class Object:
     def __delitem__(self, key):
         self.__dict__.__delitem__(key)
 
+    def __getattr__(self, key):
+        if key != "__fnm__":
+            raise AttributeError(key)
+        self.__fnm__ = os.path.join(
+            kind(self),
+            str(uuid.uuid4().hex),
+            os.sep.join(str(datetime.datetime.now()).split()),
+        )
+        return self.__fnm__
+
     def __getitem__(self, key):
         self.__dict__.__getitem__(key)
 
@@ -162,6 +197,58 @@ class Object:
         self.__dict__.__setitem__(key, value)
 
 
+class Lazy:
+
+    """stand in for a stored object, carries the store path and class and
+       loads the object on first attribute access. find(lazy=True) doesn't
+       skip deleted objects as that would load them all, check __deleted__
+       on the ones you use."""
+
+    __slots__ = ("__cls__", "__fnm__", "__obj__")
+
+    def __init__(self, cls, fnm):
+        object.__setattr__(self, "__cls__", cls)
+        object.__setattr__(self, "__fnm__", fnm)
+        object.__setattr__(self, "__obj__", None)
+
+    @property
+    def __class__(self):
+        return self.__cls__
+
+    def __contains__(self, key):
+        return key in Lazy.load(self).__dict__
+
+    def __delattr__(self, key):
+        delattr(Lazy.load(self), key)
+
+    def __getattr__(self, key):
+        return getattr(Lazy.load(self), key)
+
+    def __iter__(self):
+        return iter(Lazy.load(self))
+
+    def __len__(self):
+        return len(Lazy.load(self))
+
+    def __setattr__(self, key, value):
+        if key == "__fnm__":
+            object.__setattr__(self, key, value)
+            return
+        setattr(Lazy.load(self), key, value)
+
+    def __str__(self):
+        return str(Lazy.load(self))
+
+    @staticmethod
+    def load(lzy):
+        obj = object.__getattribute__(lzy, "__obj__")
+        if obj is None:
+            obj = lzy.__cls__()
+            load(obj, lzy.__fnm__)
+            object.__setattr__(lzy, "__obj__", obj)
+        return obj
+
+
 class Default(Object):
 
     __slots__ = ("__default__",)
@@ -171,6 +258,8 @@ class Default(Object):
         self.__default__ = ""
 
     def __getattr__(self, key):
+        if key == "__fnm__":
+            return Object.__getattr__(self, key)
         return self.__dict__.get(key, self.__default__)
 
 
@@ -190,7 +279,7 @@ def keys(obj):
 
 
 def kind(obj):
-    kin = str(type(obj)).split()[-1][1:-2]
+    kin = str(obj.__class__).split()[-1][1:-2]
     if kin == "type":
         kin = obj.__name__
     return kin
@@ -291,13 +380,15 @@ class ObjectEncoder(json.JSONEncoder):
 
 
 
-@locked(disklock)
 def dump(obj, opath):
-    cdir(opath)
-    with open(opath, "w", encoding="utf-8") as ofile:
-        json.dump(
-            obj.__dict__, ofile, cls=ObjectEncoder, indent=4, sort_keys=True
-        )
+    fnm = os.sep.join(opath.split(os.sep)[-4:])
+    store = Wd.store()
+    data = Codec.get(fnm.split(os.sep)[0], store).encode(obj.__dict__)
+    if Writer.thread:
+        Writer.put(store, fnm, data)
+    else:
+        store.write(fnm, data)
+    Cache.remove(Cache.key(opath))
     return opath
 
 
@@ -305,15 +396,14 @@ def dumps(obj):
     return json.dumps(obj, cls=ObjectEncoder)
 
 
-@locked(disklock)
 def load(obj, opath):
     splitted = opath.split(os.sep)
     fnm = os.sep.join(splitted[-4:])
-    lpath = os.path.join(Wd.workdir, "store", fnm)
-    if os.path.exists(lpath):
-        with open(lpath, "r", encoding="utf-8") as ofile:
-            res = json.load(ofile, cls=ObjectDecoder)
-            update(obj, res)
+    data = Cache.get(Cache.key(fnm))
+    if data is None:
+        data = read(fnm)
+    if data is not None:
+        update(obj, data)
     obj.__fnm__ = fnm
 
 
@@ -321,6 +411,25 @@ def loads(jss):
     return json.loads(jss, cls=ObjectDecoder)
 
 
+def read(fnm):
+    gen = Cache.gen
+    store = Wd.store()
+    txt = Writer.get(store, fnm)
+    if txt is not None:
+        return Codec.decode(txt)
+    txt = store.read(fnm)
+    if txt is None:
+        return None
+    try:
+        data = Codec.decode(txt)
+    except (EOFError, ValueError):
+        with store.lock(fnm):
+            txt = store.read(fnm)
+        data = Codec.decode(txt)
+    Cache.put(Cache.key(fnm), data, len(txt), gen)
+    return Cache.copy(data)
+
+
 def save(obj):
     prv = os.sep.join(obj.__fnm__.split(os.sep)[:2])
     obj.__fnm__ = os.path.join(prv, os.sep.join(str(datetime.datetime.now()).split()))
@@ -329,86 +438,207 @@ def save(obj):
     return obj.__fnm__
 
 
-@locked(disklock)
 def write(obj):
-    opath = Wd.getpath(obj.__fnm__)
-    cdir(opath)
-    with open(opath, "w", encoding="utf-8") as ofile:
-        json.dump(
-            obj.__dict__, ofile, cls=ObjectEncoder, indent=4, sort_keys=True
-        )
-    return opath
+    return dump(obj, Wd.getpath(obj.__fnm__))
+
+
+class Codec:
+
+    """serializers by name, pick one with Codec.default, per store (codec
+       attribute) or per type (Codec.types). stored data is self describing,
+       json starts with a { and other codecs with their magic bytes.
+       marshal writes format version 4 but stays tied to the python that
+       reads it, keep it for data that can be rebuilt or re-save with a json
+       codec before upgrading python."""
+
+    codecs = {}
+    default = "pretty"
+    types = {}
+
+    def __init__(self, name, encode, decode, magic=b""):
+        self.decoder = decode
+        self.encode = encode
+        self.magic = magic
+        self.name = name
+
+    @staticmethod
+    def add(codec):
+        Codec.codecs[codec.name] = codec
+
+    @staticmethod
+    def decode(data):
+        for codec in Codec.codecs.values():
+            if codec.magic and data.startswith(codec.magic):
+                return codec.decoder(data[len(codec.magic):])
+        return json.loads(data)
+
+    @staticmethod
+    def get(otp, store=None):
+        name = Codec.types.get(otp, None) or getattr(store, "codec", "") or Codec.default
+        return Codec.codecs[name]
+
+
+def plain(obj):
+    if isinstance(obj, Object):
+        obj = vars(obj)
+    if isinstance(obj, dict):
+        return {
+                key if isinstance(key, str) else str(key): plain(val)
+                for key, val in obj.items()
+               }
+    if isinstance(obj, (list, tuple)):
+        return [plain(x) for x in obj]
+    if obj is None or isinstance(obj, (str, bool, int, float)):
+        return obj
+    return str(obj)
+
+
+Codec.add(Codec(
+                "pretty",
+                lambda data: json.dumps(
+                                        data,
+                                        cls=ObjectEncoder,
+                                        indent=4,
+                                        sort_keys=True
+                                       ).encode("utf-8"),
+                json.loads
+               ))
+Codec.add(Codec(
+                "compact",
+                lambda data: json.dumps(
+                                        data,
+                                        cls=ObjectEncoder,
+                                        separators=(",", ":")
+                                       ).encode("utf-8"),
+                json.loads
+               ))
+Codec.add(Codec(
+                "marshal",
+                lambda data: b"\0opm" + marshal.dumps(plain(data), 4),
+                marshal.loads,
+                b"\0opm"
+               ))
 
 
 class Db:
 
+    workers = 0
+
     @staticmethod
-    def find(otp, selector=None, index=None, timed=None, deleted=True):
-        if selector is None:
-            selector = {}
-        nmr = -1
-        res = []
-        for fnm in fns(otp, timed):
-            obj = hook(fnm)
-            if deleted and "__deleted__" in obj and obj.__deleted__:
+    def find(otp, selector=None, index=None, timed=None, deleted=True, lazy=False, workers=None):
+        if index is None:
+            return list(Db.ifind(otp, selector, timed, deleted, lazy=lazy, workers=workers))
+        return list(Db.ifind(otp, selector, timed, deleted, 1, index, lazy, workers=workers))
+
+    @staticmethod
+    def hooks(paths, workers):
+        pending = collections.deque()
+        with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+            try:
+                for path in paths:
+                    pending.append(pool.submit(hook, path))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for fut in pending:
+                    fut.cancel()
+
+    @staticmethod
+    def ifind(
+              otp,
+              selector=None,
+              timed=None,
+              deleted=True,
+              limit=None,
+              offset=0,
+              lazy=False,
+              reverse=False,
+              workers=None
+             ):
+        if workers is None:
+            workers = Db.workers
+        Writer.wait()
+        paths = (
+                 Wd.getpath(x)
+                 for x in Wd.store().select(otp, selector, timed, reverse)
+                )
+        if workers > 1 and not lazy:
+            objs = Db.hooks(paths, workers)
+        else:
+            objs = (hook(x, lazy) for x in paths)
+        nmr = 0
+        for obj in objs:
+            if deleted and not lazy and "__deleted__" in obj and obj.__deleted__:
                 continue
             if selector and not search(obj, selector):
                 continue
             nmr += 1
-            if index is not None and nmr != index:
+            if nmr <= offset:
                 continue
-            res.append(obj)
-        return res
+            yield obj
+            if limit and nmr - offset >= limit:
+                break
 
     @staticmethod
     def last(otp, selector=None, index=None, timed=None):
-        res =  sorted(Db.find(otp, selector, index, timed), key=lambda x: fntime(x.__fnm__))
-        if res:
-            return res[-1]
+        if index is None:
+            objs = Db.ifind(otp, selector, timed, limit=1, reverse=True)
+        else:
+            objs = Db.ifind(otp, selector, timed, limit=1, offset=index)
+        for obj in objs:
+            return obj
         return None
 
 
 def fnclass(path):
-    try:
-        _rest, *pth = path.split("store")
-        splitted = pth[0].split(os.sep)
-        return splitted[1]
-    except ValueError:
-        pass
-    return None
+    splitted = path.split(os.sep)
+    if len(splitted) < 4:
+        return None
+    return splitted[-4]
 
 
 def fns(otp, timed=None):
-    if not otp:
-        return []
-    assert Wd.workdir
-    path = os.path.join(Wd.workdir, "store", otp) + os.sep
-    res = []
-    dname = ""
-    for rootdir, dirs, _files in os.walk(path, topdown=False):
-        if dirs:
-            dname = sorted(dirs)[-1]
-            if dname.count("-") == 2:
-                ddd = os.path.join(rootdir, dname)
-                fls = sorted(os.listdir(ddd))
-                if fls:
-                    path2 = os.path.join(ddd, fls[-1])
-                    if (
-                        timed
-                        and "from" in timed
-                        and timed["from"]
-                        and fntime(path2) < timed["from"]
-                    ):
-                        continue
-                    if timed and timed.to and fntime(path2) > timed.to:
-                        continue
-                    res.append(path2)
-    return sorted(res, key=lambda x: fntime(x))
+    return list(ifns(otp, timed))
 
 
 def fntime(daystr):
+    tme = fntime.cache.get(daystr, None)
+    if tme is None:
+        tme = fntimeparse(daystr)
+        if len(fntime.cache) >= fntime.max:
+            fntime.cache.clear()
+        fntime.cache[daystr] = tme
+    return tme
+
+
+def fntimeparse(daystr):
     daystr = daystr.replace("_", ":")
-    datestr = " ".join(daystr.split(os.sep)[-2:])
+    splitted = daystr.split(os.sep)[-2:]
+    if len(splitted) == 2:
+        day, clock = splitted
+        if (
+            len(day) == 10
+            and (len(clock) == 8 or clock[8:9] == "." and clock[9:].isdecimal())
+            and day[4] + day[7] + clock[2] + clock[5] == "--::"
+            and (day[:4] + day[5:7] + day[8:] + clock[:2] + clock[3:5] + clock[6:8]).isdecimal()
+        ):
+            tme = time.mktime((
+                               int(day[:4]),
+                               int(day[5:7]),
+                               int(day[8:]),
+                               int(clock[:2]),
+                               int(clock[3:5]),
+                               int(clock[6:8]),
+                               0,
+                               0,
+                               -1
+                              ))
+            if len(clock) > 8:
+                tme += float(clock[8:])
+            return tme
+    datestr = " ".join(splitted)
     if "." in datestr:
         datestr, rest = datestr.rsplit(".", 1)
     else:
@@ -416,31 +646,62 @@ def fntime(daystr):
     tme = time.mktime(time.strptime(datestr, "%Y-%m-%d %H:%M:%S"))
     if rest:
         tme += float("." + rest)
-    else:
-        tme = 0
     return tme
 
 
-def hook(path):
+fntime.cache = {}
+fntime.max = 100000
+
+
+def hook(path, lazy=False):
     cname = fnclass(path)
-    cls = Class.get(cname)
-    if cls:
-        obj = cls()
-    else:
-        obj = Object()
+    cls = Class.get(cname) or Object
+    if lazy:
+        return Lazy(cls, os.sep.join(path.split(os.sep)[-4:]))
+    obj = cls()
     load(obj, path)
     return obj
 
 
-def find(otp, selector=None, index=None, timed=None, deleted=True):
+def find(otp, selector=None, index=None, timed=None, deleted=True, lazy=False):
     names = Class.full(otp)
     if not names:
         names = Wd.types(otp)
-    result = []
-    for nme in names:
-        res = Db.find(nme, selector, index, timed, deleted)
-        result.extend(res)
-    return sorted(result, key=lambda x: fntime(x.__fnm__))
+    if index is None:
+        limit, offset = None, 0
+    else:
+        limit, offset = 1, index
+    return list(heapq.merge(
+                            *[
+                              Db.ifind(nme, selector, timed, deleted, limit, offset, lazy)
+                              for nme in names
+                             ],
+                            key=lambda x: fntime(x.__fnm__)
+                           ))
+
+
+def ifind(otp, selector=None, timed=None, deleted=True, limit=None, offset=0, lazy=False, reverse=False):
+    names = Class.full(otp)
+    if not names:
+        names = Wd.types(otp)
+    res = heapq.merge(
+                      *[
+                        Db.ifind(nme, selector, timed, deleted, lazy=lazy, reverse=reverse)
+                        for nme in names
+                       ],
+                      key=lambda x: fntime(x.__fnm__),
+                      reverse=reverse
+                     )
+    return itertools.islice(res, offset, limit and offset + limit)
+
+
+def ifns(otp, timed=None, reverse=False):
+    if not otp:
+        return
+    assert Wd.workdir
+    Writer.wait()
+    for fnm in Wd.store().fns(otp, timed, reverse):
+        yield Wd.getpath(fnm)
 
 
 def last(obj, selector=None):
@@ -457,8 +718,9 @@ def match(otp, selector=None):
     if not names:
         names = Wd.types(otp)
     for nme in names:
-        for item in Db.last(nme, selector):
-            return item
+        obj = Db.last(nme, selector)
+        if obj:
+            return obj
     return None
 
 
@@ -476,6 +738,85 @@ def search(obj, selector):
     return res
 
 
+class Cache:
+
+    """decoded objects by store path, least recently used ones go first when
+       maxitems or maxbytes (size on disk) is exceeded. saved versions don't
+       change, write() and dump() remove the path they overwrite. every
+       removal bumps gen, a read that started before it doesn't get cached."""
+
+    gen = 0
+    hits = 0
+    lock = _thread.allocate_lock()
+    maxbytes = 64 * 1024 * 1024
+    maxitems = 10000
+    misses = 0
+    objs = collections.OrderedDict()
+    size = 0
+
+    @staticmethod
+    def clear():
+        with Cache.lock:
+            Cache.gen += 1
+            Cache.objs.clear()
+            Cache.size = 0
+
+    @staticmethod
+    def copy(data):
+        return {
+                key: copy.deepcopy(val) if isinstance(val, (dict, list)) else val
+                for key, val in data.items()
+               }
+
+    @staticmethod
+    def get(lpath):
+        with Cache.lock:
+            res = Cache.objs.get(lpath, None)
+            if res is None:
+                Cache.misses += 1
+                return None
+            Cache.hits += 1
+            Cache.objs.move_to_end(lpath)
+        return Cache.copy(res[0])
+
+    @staticmethod
+    def key(path):
+        return os.path.join(Wd.workdir, "store", *path.split(os.sep)[-4:])
+
+    @staticmethod
+    def put(lpath, data, size, gen=None):
+        if not Cache.maxitems or size > Cache.maxbytes:
+            return
+        with Cache.lock:
+            if gen is not None and gen != Cache.gen:
+                return
+            old = Cache.objs.pop(lpath, None)
+            if old:
+                Cache.size -= old[1]
+            Cache.objs[lpath] = (data, size)
+            Cache.size += size
+            while len(Cache.objs) > Cache.maxitems or Cache.size > Cache.maxbytes:
+                _lpath, old = Cache.objs.popitem(last=False)
+                Cache.size -= old[1]
+
+    @staticmethod
+    def remove(lpath):
+        with Cache.lock:
+            Cache.gen += 1
+            old = Cache.objs.pop(lpath, None)
+            if old:
+                Cache.size -= old[1]
+
+    @staticmethod
+    def stats():
+        return Object(
+                      bytes=Cache.size,
+                      hits=Cache.hits,
+                      items=len(Cache.objs),
+                      misses=Cache.misses
+                     )
+
+
 class Class:
 
     cls = {}
@@ -506,8 +847,348 @@ class Class:
         del Class.cls[oname]
 
 
+class Index:
+
+    """latest version of every object of a type, with the store paths kept
+       sorted on time so from/to windows are answered with bisect. add()
+       inserts one path, extend() merges many and sorts once."""
+
+    def __init__(self):
+        self.fnms = []
+        self.latest = {}
+        self.mlock = _thread.allocate_lock()
+        self.stamps = []
+
+    def add(self, fnm):
+        oid = fnm.split(os.sep)[-3]
+        cur = self.latest.get(oid)
+        if cur:
+            if cur.split(os.sep)[-2:] > fnm.split(os.sep)[-2:]:
+                return
+            self.discard(cur)
+        self.latest[oid] = fnm
+        stamp = fntime(fnm)
+        pos = bisect.bisect_right(self.stamps, stamp)
+        self.stamps.insert(pos, stamp)
+        self.fnms.insert(pos, fnm)
+
+    def clear(self):
+        self.fnms = []
+        self.latest = {}
+        self.stamps = []
+
+    def discard(self, fnm):
+        pos = bisect.bisect_left(self.stamps, fntime(fnm))
+        while pos < len(self.fnms):
+            if self.fnms[pos] == fnm:
+                del self.fnms[pos]
+                del self.stamps[pos]
+                break
+            pos += 1
+
+    def extend(self, fnms):
+        for fnm in fnms:
+            oid = fnm.split(os.sep)[-3]
+            cur = self.latest.get(oid)
+            if cur and cur.split(os.sep)[-2:] > fnm.split(os.sep)[-2:]:
+                continue
+            self.latest[oid] = fnm
+        pairs = sorted((fntime(x), x) for x in self.latest.values())
+        self.stamps = [x[0] for x in pairs]
+        self.fnms = [x[1] for x in pairs]
+
+    def paths(self, start=None, end=None):
+        with self.mlock:
+            low = 0
+            high = len(self.stamps)
+            if start:
+                low = bisect.bisect_left(self.stamps, start)
+            if end:
+                high = bisect.bisect_right(self.stamps, end)
+            return self.fnms[low:high]
+
+
+class Manifest(Index):
+
+    """Index kept on disk as a list of store paths in store/<type>/.manifest.
+       Files.write() appends to it, a missing manifest or one older than the
+       type directory (objects added behind our back) gets rebuilt from the
+       tree."""
+
+    lock = _thread.allocate_lock()
+    mans = {}
+
+    def __init__(self, tdir):
+        Index.__init__(self)
+        self.offset = 0
+        self.otp = os.path.basename(tdir)
+        self.path = os.path.join(tdir, ".manifest")
+
+    def append(self, fnm):
+        with self.mlock:
+            if os.path.exists(self.path):
+                with open(self.path, "a", encoding="utf-8") as ofile:
+                    ofile.write(fnm + "\n")
+        self.sync()
+
+    @staticmethod
+    def get(tdir):
+        with Manifest.lock:
+            man = Manifest.mans.get(tdir, None)
+            if man is None:
+                man = Manifest.mans[tdir] = Manifest(tdir)
+        man.sync()
+        return man
+
+    def read(self, size):
+        with open(self.path, "rb") as ifile:
+            ifile.seek(self.offset)
+            data = ifile.read(size - self.offset)
+        if b"\n" not in data:
+            return
+        data = data[:data.rindex(b"\n")+1]
+        self.offset += len(data)
+        for line in data.decode("utf-8").splitlines():
+            if line:
+                self.add(line)
+
+    def rebuild(self):
+        self.clear()
+        fnms = []
+        tdir = os.path.dirname(self.path)
+        for uid in os.listdir(tdir):
+            if uid.startswith("."):
+                continue
+            udir = os.path.join(tdir, uid)
+            if not os.path.isdir(udir):
+                continue
+            dates = sorted(x for x in os.listdir(udir) if x.count("-") == 2)
+            if not dates:
+                continue
+            fls = sorted(
+                         x for x in os.listdir(os.path.join(udir, dates[-1]))
+                         if not x.startswith(".")
+                        )
+            if fls:
+                fnms.append(os.path.join(self.otp, uid, dates[-1], fls[-1]))
+        self.extend(fnms)
+        txt = "".join(x + "\n" for x in self.fnms)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as ofile:
+            ofile.write(txt)
+        os.replace(tmp, self.path)
+        os.utime(self.path)
+        self.offset = len(txt.encode("utf-8"))
+
+    def sync(self):
+        with self.mlock:
+            try:
+                dst = os.stat(os.path.dirname(self.path))
+            except FileNotFoundError:
+                self.clear()
+                self.offset = 0
+                return
+            try:
+                mst = os.stat(self.path)
+            except FileNotFoundError:
+                mst = None
+            if mst is None or dst.st_mtime_ns > mst.st_mtime_ns:
+                self.rebuild()
+                return
+            if mst.st_size < self.offset:
+                self.clear()
+                self.offset = 0
+            if mst.st_size > self.offset:
+                self.read(mst.st_size)
+
+
+class Store:
+
+    """storage backend, keeps versions of objects under their store path
+       (<type>/<object id>/<date>/<time>). fns() yields the latest version
+       of each object in time order, versions() all of them. select() may
+       narrow fns() down with the selector, Db.find still checks results.
+       remove() drops versions and returns the number and bytes reclaimed,
+       sweep() drops leftovers of interrupted writes and returns the bytes.
+       writers hold lock(fnm), a stripe per object, readers don't lock.
+       a reader that gets data it can't decode retries under the lock.
+       fsync is the durability policy, 0 leaves flushing to the os, 1 syncs
+       written data and 2 also syncs the directory a new file went in.
+       codec names the serializer for this store, empty is Codec.default."""
+
+    codec = ""
+    fsync = 0
+    name = ""
+    stripes = Stripes()
+
+    def __init__(self, path):
+        self.path = path
+
+    def close(self):
+        pass
+
+    def fns(self, otp, timed=None, reverse=False):
+        raise NotImplementedError("fns")
+
+    def lock(self, fnm):
+        return self.stripes.get(os.sep.join(fnm.split(os.sep)[:2]))
+
+    def read(self, fnm):
+        raise NotImplementedError("read")
+
+    def remove(self, fnms):
+        raise NotImplementedError("remove")
+
+    def select(self, otp, selector=None, timed=None, reverse=False):
+        return self.fns(otp, timed, reverse)
+
+    def sweep(self, otp):
+        return 0
+
+    def types(self):
+        raise NotImplementedError("types")
+
+    def versions(self, otp):
+        raise NotImplementedError("versions")
+
+    def write(self, fnm, data):
+        raise NotImplementedError("write")
+
+    def writemany(self, items):
+        for fnm, data in items:
+            self.write(fnm, data)
+
+
+class Files(Store):
+
+    """one file per version in the store directory, the default layout.
+       files are written to a temporary file next to them and renamed into
+       place, readers never see a partial file. temporary files left by a
+       process that died go with sweep()."""
+
+    name = "files"
+
+    def fns(self, otp, timed=None, reverse=False):
+        start, end = window(timed)
+        fnms = self.manifest(otp).paths(start, end)
+        if reverse:
+            fnms.reverse()
+        return iter(fnms)
+
+    def manifest(self, otp):
+        return Manifest.get(os.path.join(self.path, "store", otp))
+
+    def read(self, fnm):
+        try:
+            with open(os.path.join(self.path, "store", fnm), "rb") as ifile:
+                return ifile.read()
+        except FileNotFoundError:
+            return None
+
+    def remove(self, fnms):
+        nmr = 0
+        size = 0
+        sdr = os.path.join(self.path, "store")
+        for fnm in fnms:
+            path = os.path.join(sdr, fnm)
+            with self.lock(fnm):
+                try:
+                    size += os.path.getsize(path)
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+                nmr += 1
+                for ddd in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                    try:
+                        os.rmdir(ddd)
+                    except OSError:
+                        break
+                    cdir.known.discard(os.path.abspath(ddd))
+        for otp in set(x.split(os.sep)[0] for x in fnms):
+            try:
+                os.unlink(os.path.join(sdr, otp, ".manifest"))
+            except FileNotFoundError:
+                pass
+        return nmr, size
+
+    def sweep(self, otp):
+        size = 0
+        for rootdir, _dirs, fls in os.walk(os.path.join(self.path, "store", otp)):
+            for fnm in fls:
+                if not fnm.startswith(".") or not fnm.endswith(".tmp"):
+                    continue
+                pid = fnm.split(".")[-2]
+                if not pid.isdigit():
+                    continue
+                try:
+                    os.kill(int(pid), 0)
+                    continue
+                except ProcessLookupError:
+                    pass
+                except OSError:
+                    continue
+                path = os.path.join(rootdir, fnm)
+                try:
+                    size += os.path.getsize(path)
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        return size
+
+    def types(self):
+        sdr = os.path.join(self.path, "store")
+        if not os.path.exists(sdr):
+            return []
+        return [x for x in os.listdir(sdr) if not x.startswith(".")]
+
+    def versions(self, otp):
+        res = []
+        sdr = os.path.join(self.path, "store")
+        for rootdir, _dirs, fls in os.walk(os.path.join(sdr, otp)):
+            for fnm in fls:
+                if not fnm.startswith("."):
+                    res.append(os.path.relpath(os.path.join(rootdir, fnm), sdr))
+        return sorted(res, key=fntime)
+
+    def write(self, fnm, data):
+        opath = os.path.join(self.path, "store", fnm)
+        ddd, fname = os.path.split(opath)
+        tmp = os.path.join(ddd, ".%s.%s.tmp" % (fname, os.getpid()))
+        with self.lock(fnm):
+            cdir(opath)
+            try:
+                ofile = open(tmp, "wb")
+            except FileNotFoundError:
+                cdir.known.clear()
+                cdir(opath)
+                ofile = open(tmp, "wb")
+            try:
+                with ofile:
+                    ofile.write(data)
+                    if self.fsync:
+                        ofile.flush()
+                        os.fsync(ofile.fileno())
+                os.replace(tmp, opath)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except FileNotFoundError:
+                    pass
+                raise
+            if self.fsync > 1:
+                fds = os.open(ddd, os.O_RDONLY)
+                try:
+                    os.fsync(fds)
+                finally:
+                    os.close(fds)
+        self.manifest(fnm.split(os.sep)[0]).append(fnm)
+
+
 class Wd:
 
+    lock = _thread.allocate_lock()
+    opened = {}
+    stores = {"files": Files}
     workdir = ""
 
     @staticmethod
@@ -532,8 +1213,28 @@ class Wd:
         return mdr
 
     @staticmethod
-    def set(path):
+    def set(path, store=None, codec=None):
         Wd.workdir = path
+        if store:
+            Writer.wait()
+            with Wd.lock:
+                old = Wd.opened.pop(path, None)
+                if old:
+                    old.close()
+                Wd.opened[path] = Wd.stores[store](path)
+        if codec:
+            Wd.store().codec = codec
+
+    @staticmethod
+    def store():
+        path = Wd.get()
+        sto = Wd.opened.get(path, None)
+        if sto is None:
+            with Wd.lock:
+                sto = Wd.opened.get(path, None)
+                if sto is None:
+                    sto = Wd.opened[path] = Wd.stores[Wd.storename(path)](path)
+        return sto
 
     @staticmethod
     def storedir():
@@ -541,11 +1242,19 @@ class Wd:
         cdir(sdr)
         return sdr
 
+    @staticmethod
+    def storename(path):
+        try:
+            with open(os.path.join(path, "storage"), "r", encoding="utf-8") as ifile:
+                return ifile.read().strip() or "files"
+        except FileNotFoundError:
+            return "files"
+
     @staticmethod
     def types(oname=None):
-        sdr = Wd.storedir()
         res = []
-        for fnm in os.listdir(sdr):
+        Writer.wait()
+        for fnm in Wd.store().types():
             if oname and oname.lower() not in fnm.split(".")[-1].lower():
                 continue
             if fnm not in res:
@@ -553,13 +1262,142 @@ class Wd:
         return res
 
 
+class Writer:
+
+    """write-behind, with the writer started save() queues the encoded
+       object and returns, the writer thread commits all pending writes as
+       one batch with Store.writemany(). reads see pending writes, listing
+       (fns, find, types) waits for the writer first, flush() waits for
+       everything queued before it to be on the store and raises the first
+       error of the batches that failed since the previous flush. the writer
+       runs as long as one of its owners (start(owner)) has not stopped it."""
+
+    cond = threading.Condition()
+    done = 0
+    errors = []
+    inflight = {}
+    owners = set()
+    pending = {}
+    queued = 0
+    stopping = False
+    thread = None
+
+    @staticmethod
+    def commit(batch):
+        bystore = {}
+        for store, fnm, data in batch.values():
+            bystore.setdefault(store, []).append((fnm, data))
+        for store, items in bystore.items():
+            try:
+                store.writemany(items)
+            except Exception as ex:
+                Writer.errors.append(ex)
+
+    @staticmethod
+    def flush():
+        Writer.wait()
+        with Writer.cond:
+            errors = Writer.errors
+            Writer.errors = []
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def get(store, fnm):
+        if not Writer.pending and not Writer.inflight:
+            return None
+        with Writer.cond:
+            item = Writer.pending.get((store, fnm), None)
+            if item is None:
+                item = Writer.inflight.get((store, fnm), None)
+        return item and item[2]
+
+    @staticmethod
+    def loop():
+        while 1:
+            with Writer.cond:
+                while not Writer.pending and not Writer.stopping:
+                    Writer.cond.wait()
+                if not Writer.pending:
+                    break
+                Writer.inflight = Writer.pending
+                Writer.pending = {}
+                seq = Writer.queued
+            Writer.commit(Writer.inflight)
+            with Writer.cond:
+                Writer.inflight = {}
+                Writer.done = seq
+                Writer.cond.notify_all()
+
+    @staticmethod
+    def put(store, fnm, data):
+        with Writer.cond:
+            if Writer.thread and not Writer.stopping:
+                Writer.pending[(store, fnm)] = (store, fnm, data)
+                Writer.queued += 1
+                Writer.cond.notify_all()
+                return
+        store.write(fnm, data)
+
+    @staticmethod
+    def start(owner=None):
+        with Writer.cond:
+            Writer.owners.add(owner if owner is None else repr(owner))
+            if Writer.thread:
+                return
+            Writer.stopping = False
+            Writer.thread = threading.Thread(target=Writer.loop, name="Writer.loop", daemon=True)
+            Writer.thread.start()
+
+    @staticmethod
+    def stop(owner=None):
+        with Writer.cond:
+            Writer.owners.discard(owner if owner is None else repr(owner))
+            thr = Writer.thread
+            if not thr or Writer.owners:
+                return
+            Writer.stopping = True
+            Writer.cond.notify_all()
+        thr.join()
+        with Writer.cond:
+            Writer.thread = None
+            Writer.cond.notify_all()
+
+    @staticmethod
+    def wait():
+        if not Writer.thread:
+            return
+        with Writer.cond:
+            target = Writer.queued
+            while Writer.done < target and Writer.thread:
+                Writer.cond.wait()
+
+
 def cdir(path):
     path = os.path.abspath(path)
     fname = path.split(os.sep)[-1]
     if fname.count(":") == 2:
         path = os.path.dirname(path)
+    if path in cdir.known:
+        return
     ppp = pathlib.Path(path)
     ppp.mkdir(parents=True, exist_ok=True)
+    if len(cdir.known) >= cdir.max:
+        cdir.known.clear()
+    else:
+        cdir.known.add(path)
+
+
+cdir.known = set()
+cdir.max = 10000
+
+
+def window(timed):
+    if not timed:
+        return None, None
+    if isinstance(timed, dict):
+        return timed.get("from", None), timed.get("to", None)
+    return getattr(timed, "from", None), getattr(timed, "to", None)
 
 
 def spl(txt):
@@ -0,0 +1,545 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116,E0402
+
+
+"""storage
+
+
+alternative stores for the objects layer. the default store (Files) keeps
+one file per version in workdir/store, Segments appends versions to a few
+large files per type and Sqlite keeps them as rows in a sqlite database.
+select one with Wd.set(path, store) or use the mig
+command, which copies every version over and records the choice in the
+storage file of the workdir.
+
+"""
+
+
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+import _thread
+
+
+from .objects import Cache, Class, Codec, Index, Object, Store, Wd, Writer
+from .objects import cdir, fntime, items, window
+from .threads import Repeater
+
+
+def __dir__():
+    return (
+            'Log',
+            'Segments',
+            'Sqlite',
+            'compact',
+            'compactor',
+            'cpt',
+            'mig',
+            'migrate'
+           )
+
+
+__all__ = __dir__()
+
+
+HEADER = struct.Struct("<II")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    fnm TEXT PRIMARY KEY,
+    otp TEXT NOT NULL,
+    oid TEXT NOT NULL,
+    stamp REAL NOT NULL,
+    latest INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_latest ON versions (otp, latest, stamp);
+CREATE INDEX IF NOT EXISTS versions_oid ON versions (otp, oid, latest);
+"""
+
+
+class Log(Index):
+
+    """offset index over the segment files of one type. records are a length
+       and crc32 header followed by the store path, a nul byte and the data.
+       scanning stops at a record that is cut short or doesn't match its crc,
+       the next write starts a new segment after such a tail. compaction
+       closes the descriptors of the segments it removes, reads check the
+       crc and path of the record they got and sync again when it's off."""
+
+    def __init__(self, path):
+        Index.__init__(self)
+        self.fds = {}
+        self.offsets = {}
+        self.path = path
+        self.scanned = {}
+        self.wlock = _thread.allocate_lock()
+
+    def close(self):
+        with self.mlock:
+            for fds in self.fds.values():
+                os.close(fds)
+            self.fds = {}
+
+    def compact(self, drop):
+        with self.wlock:
+            self.sync()
+            with self.mlock:
+                segs = self.segments()
+                if not segs:
+                    return 0, 0
+                before = sum(os.path.getsize(os.path.join(self.path, x)) for x in segs)
+                nmr = len([x for x in drop if x in self.offsets])
+                nrs = int(segs[-1][:-4]) + 1
+                ofile = None
+                tmps = []
+                try:
+                    for fnm in sorted(self.offsets, key=fntime):
+                        if fnm in drop:
+                            continue
+                        seg, offset, length, _skip = self.offsets[fnm]
+                        with open(os.path.join(self.path, seg), "rb") as ifile:
+                            ifile.seek(offset + HEADER.size)
+                            payload = ifile.read(length - HEADER.size)
+                        if ofile is None or ofile.tell() >= Segments.maxsize:
+                            if ofile:
+                                ofile.close()
+                            tmps.append(os.path.join(self.path, "%08d.tmp" % nrs))
+                            ofile = open(tmps[-1], "wb")
+                            nrs += 1
+                        ofile.write(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+                finally:
+                    if ofile:
+                        ofile.close()
+                for tmp in tmps:
+                    os.replace(tmp, tmp[:-4] + ".seg")
+                for seg in segs:
+                    os.unlink(os.path.join(self.path, seg))
+                    fds = self.fds.pop(seg, None)
+                    if fds is not None:
+                        os.close(fds)
+                self.clear()
+                self.offsets = {}
+                self.scanned = {}
+            self.sync()
+            after = sum(os.path.getsize(os.path.join(self.path, x)) for x in self.segments())
+        return nmr, before - after
+
+    def fd(self, seg):
+        fds = self.fds.get(seg, None)
+        if fds is None:
+            with self.mlock:
+                fds = self.fds.get(seg, None)
+                if fds is None:
+                    fds = os.open(os.path.join(self.path, seg), os.O_RDONLY)
+                    self.fds[seg] = fds
+        return fds
+
+    def read(self, fnm):
+        loc = self.offsets.get(fnm, None)
+        if loc is None:
+            self.sync()
+            loc = self.offsets.get(fnm, None)
+            if loc is None:
+                return None
+        seg, offset, length, skip = loc
+        try:
+            rec = os.pread(self.fd(seg), length, offset)
+        except OSError:
+            rec = b""
+        if (
+            len(rec) != length
+            or HEADER.unpack(rec[:HEADER.size])[1] != zlib.crc32(rec[HEADER.size:])
+            or rec[HEADER.size:skip - 1] != fnm.encode("utf-8")
+           ):
+            self.sync()
+            if fnm not in self.offsets or self.offsets[fnm] == loc:
+                return None
+            return self.read(fnm)
+        return rec[skip:]
+
+    def scan(self, seg, size):
+        offset = self.scanned.get(seg, 0)
+        with open(os.path.join(self.path, seg), "rb") as ifile:
+            ifile.seek(offset)
+            while offset + HEADER.size <= size:
+                length, crc = HEADER.unpack(ifile.read(HEADER.size))
+                if offset + HEADER.size + length > size:
+                    break
+                payload = ifile.read(length)
+                if zlib.crc32(payload) != crc:
+                    break
+                nul = payload.index(b"\0")
+                fnm = payload[:nul].decode("utf-8")
+                self.offsets[fnm] = (seg, offset, HEADER.size + length, HEADER.size + nul + 1)
+                self.add(fnm)
+                offset += HEADER.size + length
+        self.scanned[seg] = offset
+
+    def segments(self):
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(x for x in os.listdir(self.path) if x.endswith(".seg"))
+
+    def sync(self):
+        with self.mlock:
+            for seg in self.segments():
+                size = os.path.getsize(os.path.join(self.path, seg))
+                if size > self.scanned.get(seg, 0):
+                    self.scan(seg, size)
+
+    def write(self, fnm, data):
+        self.writemany([(fnm, data)])
+
+    def writemany(self, items):
+        records = []
+        for fnm, data in items:
+            payload = fnm.encode("utf-8") + b"\0" + data
+            records.append(HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        with self.wlock:
+            self.sync()
+            os.makedirs(self.path, exist_ok=True)
+            segs = self.segments()
+            seg = segs and segs[-1] or "%08d.seg" % 0
+            if segs:
+                size = os.path.getsize(os.path.join(self.path, seg))
+                if size >= Segments.maxsize or size != self.scanned.get(seg, 0):
+                    seg = "%08d.seg" % (int(seg[:-4]) + 1)
+            fds = os.open(
+                          os.path.join(self.path, seg),
+                          os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                          0o644
+                         )
+            try:
+                os.write(fds, b"".join(records))
+                if Segments.fsync:
+                    os.fsync(fds)
+            finally:
+                os.close(fds)
+        self.sync()
+
+
+class Segments(Store):
+
+    "append-only segment files per type in workdir/segments/<type>"
+
+    maxsize = 64 * 1024 * 1024
+    name = "segments"
+
+    def __init__(self, path):
+        Store.__init__(self, path)
+        self.loglock = _thread.allocate_lock()
+        self.logs = {}
+
+    def close(self):
+        for log in list(self.logs.values()):
+            log.close()
+
+    def fns(self, otp, timed=None, reverse=False):
+        start, end = window(timed)
+        log = self.log(otp)
+        log.sync()
+        fnms = log.paths(start, end)
+        if reverse:
+            fnms.reverse()
+        return iter(fnms)
+
+    def log(self, otp):
+        log = self.logs.get(otp, None)
+        if log is None:
+            with self.loglock:
+                log = self.logs.get(otp, None)
+                if log is None:
+                    log = Log(os.path.join(self.path, "segments", otp))
+                    self.logs[otp] = log
+        return log
+
+    def read(self, fnm):
+        return self.log(fnm.split(os.sep)[0]).read(fnm)
+
+    def remove(self, fnms):
+        nmr = 0
+        size = 0
+        byotp = {}
+        for fnm in fnms:
+            byotp.setdefault(fnm.split(os.sep)[0], set()).add(fnm)
+        for otp, drop in byotp.items():
+            nrs, sze = self.log(otp).compact(drop)
+            nmr += nrs
+            size += sze
+        return nmr, size
+
+    def types(self):
+        sdr = os.path.join(self.path, "segments")
+        if not os.path.exists(sdr):
+            return []
+        return os.listdir(sdr)
+
+    def versions(self, otp):
+        log = self.log(otp)
+        log.sync()
+        return sorted(log.offsets, key=fntime)
+
+    def write(self, fnm, data):
+        self.log(fnm.split(os.sep)[0]).write(fnm, data)
+
+    def writemany(self, items):
+        byotp = {}
+        for fnm, data in items:
+            byotp.setdefault(fnm.split(os.sep)[0], []).append((fnm, data))
+        for otp, batch in byotp.items():
+            self.log(otp).writemany(batch)
+
+
+class Sqlite(Store):
+
+    """versions as rows in workdir/store.db, indexed on type, object id and
+       time. the latest version of every object is flagged so fns() and
+       timed windows are index lookups, selectors are pushed down into the
+       query with json_extract, rows without the key are left for search()
+       as the class may provide it. data stays json, other codecs are
+       converted to compact json on write."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        Store.__init__(self, path)
+        self.dbpath = os.path.join(path, "store.db")
+        self.local = threading.local()
+
+    def close(self):
+        con = getattr(self.local, "con", None)
+        if con:
+            con.close()
+            self.local.con = None
+
+    def db(self):
+        con = getattr(self.local, "con", None)
+        if con is None:
+            os.makedirs(self.path, exist_ok=True)
+            con = sqlite3.connect(self.dbpath, timeout=60, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=%s" % (self.fsync and "FULL" or "NORMAL"))
+            con.executescript(SCHEMA)
+            self.local.con = con
+        return con
+
+    def fns(self, otp, timed=None, reverse=False):
+        return self.select(otp, None, timed, reverse)
+
+    def read(self, fnm):
+        row = self.db().execute(
+                                "SELECT data FROM versions WHERE fnm = ?",
+                                (fnm,)
+                               ).fetchone()
+        if row is None:
+            return None
+        return row[0].encode("utf-8")
+
+    def remove(self, fnms):
+        nmr = 0
+        size = 0
+        con = self.db()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for fnm in fnms:
+                row = con.execute(
+                                  "SELECT length(CAST(data AS BLOB)) FROM versions WHERE fnm = ?",
+                                  (fnm,)
+                                 ).fetchone()
+                if row is None:
+                    continue
+                con.execute("DELETE FROM versions WHERE fnm = ?", (fnm,))
+                nmr += 1
+                size += row[0]
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        return nmr, size
+
+    def select(self, otp, selector=None, timed=None, reverse=False):
+        sql = "SELECT fnm FROM versions WHERE otp = ? AND latest = 1"
+        args = [otp]
+        start, end = window(timed)
+        if start:
+            sql += " AND stamp >= ?"
+            args.append(start)
+        if end:
+            sql += " AND stamp <= ?"
+            args.append(end)
+        ors = []
+        sargs = []
+        for key, value in items(selector or {}):
+            value = str(value)
+            if not value or key.startswith("_") or '"' in key:
+                ors = []
+                break
+            path = '$."%s"' % key
+            ors.append(
+                       "(json_type(data, ?) IS NULL OR json_type(data, ?) != 'text'"
+                       " OR instr(json_extract(data, ?), ?) > 0)"
+                      )
+            sargs.extend((path, path, path, value))
+        if ors:
+            sql += " AND (%s)" % " OR ".join(ors)
+            args.extend(sargs)
+        sql += " ORDER BY stamp DESC, fnm DESC" if reverse else " ORDER BY stamp, fnm"
+        return iter([x[0] for x in self.db().execute(sql, args).fetchall()])
+
+    def types(self):
+        return [x[0] for x in self.db().execute("SELECT DISTINCT otp FROM versions")]
+
+    def versions(self, otp):
+        return [
+                x[0] for x in self.db().execute(
+                    "SELECT fnm FROM versions WHERE otp = ? ORDER BY stamp, fnm",
+                    (otp,)
+                   )
+               ]
+
+    def write(self, fnm, data):
+        self.writemany([(fnm, data)])
+
+    def writemany(self, items):
+        con = self.db()
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for fnm, data in items:
+                otp, oid = fnm.split(os.sep)[:2]
+                stamp = fntime(fnm)
+                if not data.startswith(b"{"):
+                    data = Codec.codecs["compact"].encode(Codec.decode(data))
+                cur = con.execute(
+                                  "SELECT fnm, stamp FROM versions"
+                                  " WHERE otp = ? AND oid = ? AND latest = 1",
+                                  (otp, oid)
+                                 ).fetchone()
+                latest = 1
+                if cur and cur[0] != fnm:
+                    if (cur[1], cur[0]) > (stamp, fnm):
+                        latest = 0
+                    else:
+                        con.execute("UPDATE versions SET latest = 0 WHERE fnm = ?", (cur[0],))
+                con.execute(
+                            "INSERT OR REPLACE INTO versions"
+                            " (fnm, otp, oid, stamp, latest, data) VALUES (?, ?, ?, ?, ?, ?)",
+                            (fnm, otp, oid, stamp, latest, data.decode("utf-8"))
+                           )
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+
+
+def compact(otp=None, keep=0, age=0, deleted=False, store=None):
+    """drop old versions. of every object the latest keep versions and the
+       ones younger than age seconds stay, with neither set only the latest
+       stays. with deleted set, objects whose latest version is tombstoned
+       (__deleted__) go completely."""
+    Writer.wait()
+    store = store or Wd.store()
+    res = Object()
+    res.bytes = 0
+    res.files = 0
+    now = time.time()
+    for typ in (otp and [otp] or store.types()):
+        res.bytes += store.sweep(typ)
+        byoid = {}
+        for fnm in store.versions(typ):
+            byoid.setdefault(fnm.split(os.sep)[1], []).append(fnm)
+        drop = []
+        for fnms in byoid.values():
+            if deleted and tombstoned(store, fnms[-1]):
+                drop.extend(fnms)
+                continue
+            for nmr, fnm in enumerate(reversed(fnms)):
+                if not nmr or nmr < keep:
+                    continue
+                if age and now - fntime(fnm) < age:
+                    continue
+                drop.append(fnm)
+        if not drop:
+            continue
+        nmr, size = store.remove(drop)
+        for fnm in drop:
+            Cache.remove(Cache.key(fnm))
+        res.files += nmr
+        res.bytes += size
+    return res
+
+
+def compactor(interval, otp=None, keep=0, age=0, deleted=False):
+    "compact every interval seconds, the last report is in state['compacted']"
+    def job():
+        repeater.state["compacted"] = compact(otp, keep, age, deleted)
+    repeater = Repeater(interval, job, thrname="compactor")
+    repeater.start()
+    return repeater
+
+
+def cpt(event):
+    names = []
+    if event.args:
+        names = Class.full(event.args[0]) or Wd.types(event.args[0])
+        if not names:
+            event.reply("no %s type" % event.args[0])
+            return
+    keep = int(event.sets.keep or 0)
+    age = int(event.sets.age or 0)
+    deleted = event.sets.deleted in ("1", "true", "yes")
+    res = Object()
+    res.bytes = 0
+    res.files = 0
+    for otp in names or [None]:
+        one = compact(otp, keep, age, deleted)
+        res.bytes += one.bytes
+        res.files += one.files
+    event.reply("reclaimed %s versions, %s bytes" % (res.files, res.bytes))
+
+
+def tombstoned(store, fnm):
+    data = store.read(fnm)
+    if data is None:
+        return False
+    return bool(Codec.decode(data).get("__deleted__", False))
+
+
+def migrate(src, dst):
+    Writer.wait()
+    nmr = 0
+    for otp in src.types():
+        for fnm in src.versions(otp):
+            data = src.read(fnm)
+            if data is None:
+                continue
+            dst.write(fnm, data)
+            nmr += 1
+    return nmr
+
+
+def mig(event):
+    if not event.args or event.args[0] not in Wd.stores:
+        event.reply("mig <%s>" % "|".join(sorted(Wd.stores)))
+        return
+    name = event.args[0]
+    src = Wd.store()
+    if src.name == name:
+        event.reply("already using %s" % name)
+        return
+    dst = Wd.stores[name](Wd.workdir)
+    nmr = migrate(src, dst)
+    dst.close()
+    cdir(Wd.workdir)
+    with open(os.path.join(Wd.workdir, "storage"), "w", encoding="utf-8") as ofile:
+        ofile.write(name + "\n")
+    Wd.set(Wd.workdir, name)
+    event.reply("migrated %s versions from %s to %s" % (nmr, src.name, name))
+
+
+Wd.stores["segments"] = Segments
+Wd.stores["sqlite"] = Sqlite
@@ -1,10 +1,11 @@
 # This file is placed in the Public Domain.
-# pylint: disable=C0112,C0115,C0116,R0902
+# pylint: disable=C0112,C0115,C0116,R0902,W0703
 
 
 "threads"
 
 
+import collections
 import queue
 import threading
 import time
@@ -13,6 +14,8 @@ import types
 
 def __dir__():
     return (
+            'Bounded',
+            'Pool',
             'Thread',
             'Timer',
             'Repeater',
@@ -64,6 +67,143 @@ class Thread(threading.Thread):
         self.starttime = time.time()
         self._result = func(*args)
 
+
+class Bounded:
+
+    """queue with an overflow policy for when maxsize items are waiting,
+       block waits for room, oldest drops the oldest waiting item and newest
+       drops the item being put. put() returns False when that item got
+       dropped. ondrop, when given, gets called with every dropped item.
+       configure() changes the bounds of a queue in use. close() lets get()
+       drain what is left and then return None."""
+
+    policies = ("block", "newest", "oldest")
+
+    def __init__(self, maxsize=0, policy="block", ondrop=None):
+        self.closed = False
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.enqueued = 0
+        self.items = collections.deque()
+        self.maxdepth = 0
+        self.maxsize = 0
+        self.ondrop = None
+        self.policy = "block"
+        self.configure(maxsize, policy, ondrop)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def configure(self, maxsize=0, policy="block", ondrop=None):
+        if policy not in Bounded.policies:
+            raise ValueError("policy %s not in %s" % (policy, ",".join(Bounded.policies)))
+        with self.cond:
+            self.maxsize = maxsize
+            self.ondrop = ondrop
+            self.policy = policy
+            self.cond.notify_all()
+
+    def get(self, timeout=None):
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.items or self.closed, timeout):
+                raise queue.Empty
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def put(self, item):
+        drop = None
+        with self.cond:
+            if self.maxsize and len(self.items) >= self.maxsize and not self.closed:
+                if self.policy == "newest":
+                    drop = item
+                elif self.policy == "oldest":
+                    drop = self.items.popleft()
+                else:
+                    self.cond.wait_for(
+                                       lambda: not self.maxsize
+                                               or len(self.items) < self.maxsize
+                                               or self.closed
+                                      )
+            if self.closed:
+                drop = item
+            if drop is not item:
+                self.items.append(item)
+                self.enqueued += 1
+                self.maxdepth = max(self.maxdepth, len(self.items))
+                self.cond.notify_all()
+            if drop is not None:
+                self.dropped += 1
+        if drop is not None and self.ondrop:
+            self.ondrop(drop)
+        return drop is not item
+
+    def stats(self):
+        with self.cond:
+            return {
+                    "depth": len(self.items),
+                    "dropped": self.dropped,
+                    "enqueued": self.enqueued,
+                    "maxdepth": self.maxdepth
+                   }
+
+
+class Pool:
+
+    """a fixed number of worker threads that run (func, args) from a queue,
+       with limit set put() blocks while that many are waiting. errors keeps
+       the last maxerrors exceptions raised by jobs."""
+
+    maxerrors = 100
+
+    def __init__(self, workers=4, limit=0, thrname="Pool"):
+        self.errors = collections.deque(maxlen=Pool.maxerrors)
+        self.lock = threading.Lock()
+        self.name = thrname
+        self.queue = queue.Queue(limit)
+        self.threads = []
+        self.workers = workers
+
+    def loop(self):
+        while 1:
+            job = self.queue.get()
+            if job is None:
+                break
+            func, args = job
+            try:
+                func(*args)
+            except Exception as ex:
+                self.errors.append(ex)
+
+    def put(self, func, *args):
+        if len(self.threads) < self.workers:
+            self.start()
+        self.queue.put((func, args))
+
+    def start(self):
+        with self.lock:
+            while len(self.threads) < self.workers:
+                thr = threading.Thread(
+                                       target=self.loop,
+                                       name="%s-%s" % (self.name, len(self.threads)),
+                                       daemon=True
+                                      )
+                thr.start()
+                self.threads.append(thr)
+
+    def stop(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _thr in threads:
+            self.queue.put(None)
+        for thr in threads:
+            thr.join()
+
+
 class Timer:
 
     def __init__(self, sleep, func, *args, thrname=None):
@@ -5,10 +5,12 @@
 "bus"
 
 
+import threading
+import time
 import unittest
 
 
-from opr.hdl import Bus, Handler
+from opr.handler import Bus, Handler
 
 
 class Client(Handler):
@@ -29,6 +31,26 @@ class Client(Handler):
         self.raw(txt)
 
 
+class Stuck(Client):
+
+    def __init__(self):
+        Client.__init__(self)
+        self.unstuck = threading.Event()
+
+    def raw(self, txt):
+        self.unstuck.wait()
+
+
+class Batched(Client):
+
+    def __init__(self):
+        Client.__init__(self)
+        self.batches = []
+
+    def saymany(self, channel, txts):
+        self.batches.append((channel, txts))
+
+
 class TestBus(unittest.TestCase):
 
     def setUp(self):
@@ -36,17 +58,60 @@ class TestBus(unittest.TestCase):
 
     def test_add(self):
         clt = Client()
-        self.assertTrue(clt in Bus.objs)
+        self.assertIs(Bus.objs.get(clt.orig), clt)
 
     def test_announce(self):
+        clt = Client()
         Bus.announce("test")
         self.assertTrue(Client.gotcha)
+        self.assertTrue(clt)
 
     def test_byorig(self):
         clt = Client()
         self.assertEqual(Bus.byorig(clt.orig), clt)
 
+    def test_collect(self):
+        orig = Client().orig
+        self.assertIsNone(Bus.byorig(orig))
+
+    def test_remove(self):
+        clt = Client()
+        Bus.remove(clt)
+        self.assertIsNone(Bus.byorig(clt.orig))
+
     def test_say(self):
         clt = Client()
         Bus.say(clt.orig, "#test", "test")
         self.assertTrue(Client.gotcha)
+
+    def test_outbox(self):
+        stuck = Stuck()
+        stuck.outqueue(1, "oldest")
+        clt = Client()
+        for _nr in range(3):
+            Bus.announce("test")
+        self.assertTrue(Client.gotcha)
+        self.assertGreaterEqual(stuck.outbox.stats()["dropped"], 1)
+        stuck.unstuck.set()
+        stuck.stop()
+        self.assertTrue(clt)
+
+    def test_output(self):
+        clt = Batched()
+        Bus.saymany(clt.orig, "#test", [str(x) for x in range(12)])
+        self.assertEqual(clt.output, None)
+        self.assertEqual(len(clt.batches), 1)
+        clt.batches.clear()
+        clt.throttle(rate=50, burst=5, batch=5)
+        Bus.saymany(clt.orig, "#test", [str(x) for x in range(12)])
+        Bus.say(clt.orig, "#other", "txt")
+        self.assertTrue(clt.output.backlog())
+        clt.stop()
+        for _nr in range(100):
+            if clt.output.sent == 13:
+                break
+            time.sleep(0.01)
+        self.assertEqual(clt.output.backlog(), {})
+        self.assertTrue(all(len(x[1]) <= 5 for x in clt.batches))
+        lines = [x for chan, txts in clt.batches if chan == "#test" for x in txts]
+        self.assertEqual(lines, [str(x) for x in range(12)])
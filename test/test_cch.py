@@ -0,0 +1,82 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"cache"
+
+
+import unittest
+
+
+from opr.objects import Cache, Object, Wd, load, save, write
+
+
+Wd.workdir = ".test"
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        Cache.clear()
+
+    def test_hit(self):
+        obj = Object()
+        obj.key = "value"
+        fnm = save(obj)
+        load(Object(), fnm)
+        hits = Cache.hits
+        oobj = Object()
+        load(oobj, fnm)
+        self.assertEqual(Cache.hits, hits + 1)
+        self.assertEqual(oobj.key, "value")
+
+    def test_copy(self):
+        obj = Object()
+        obj.lst = ["a"]
+        fnm = save(obj)
+        oobj = Object()
+        load(oobj, fnm)
+        oobj.lst.append("b")
+        ooobj = Object()
+        load(ooobj, fnm)
+        self.assertEqual(ooobj.lst, ["a"])
+
+    def test_maxitems(self):
+        maxitems = Cache.maxitems
+        Cache.maxitems = 2
+        try:
+            for _nr in range(3):
+                load(Object(), save(Object()))
+            self.assertEqual(Cache.stats().items, 2)
+        finally:
+            Cache.maxitems = maxitems
+
+    def test_write(self):
+        obj = Object()
+        obj.key = "value"
+        write(obj)
+        load(Object(), obj.__fnm__)
+        obj.key = "changed"
+        write(obj)
+        oobj = Object()
+        load(oobj, obj.__fnm__)
+        self.assertEqual(oobj.key, "changed")
+
+    def test_race(self):
+        obj = Object()
+        obj.key = "old"
+        write(obj)
+        store = Wd.store()
+        def racing(fnm):
+            data = type(store).read(store, fnm)
+            obj.key = "new"
+            write(obj)
+            return data
+        store.read = racing
+        try:
+            load(Object(), obj.__fnm__)
+        finally:
+            del store.read
+        oobj = Object()
+        load(oobj, obj.__fnm__)
+        self.assertEqual(oobj.key, "new")
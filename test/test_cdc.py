@@ -0,0 +1,92 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"codec"
+
+
+import os
+import unittest
+
+
+from opr.objects import Cache, Codec, Object, Wd, kind, load, save
+from opr.storage import Sqlite
+
+
+Wd.workdir = ".test"
+
+
+class Cdc(Object):
+
+    pass
+
+
+def raw(fnm):
+    with open(Wd.getpath(fnm), "rb") as ifile:
+        return ifile.read()
+
+
+class TestCodec(unittest.TestCase):
+
+    def tearDown(self):
+        Codec.types.clear()
+        Wd.store().codec = ""
+        Cache.clear()
+
+    def roundtrip(self):
+        obj = Cdc()
+        obj.txt = "bla"
+        obj.nrs = [1, 2.5, None]
+        obj.sub = {"a": True}
+        fnm = save(obj)
+        Cache.clear()
+        oobj = Cdc()
+        load(oobj, fnm)
+        self.assertEqual(vars(oobj), vars(obj))
+        return fnm
+
+    def test_compact(self):
+        Wd.set(Wd.workdir, codec="compact")
+        fnm = self.roundtrip()
+        self.assertNotIn(b"\n", raw(fnm))
+
+    def test_marshal(self):
+        Wd.set(Wd.workdir, codec="marshal")
+        fnm = self.roundtrip()
+        self.assertTrue(raw(fnm).startswith(b"\0opm"))
+
+    def test_mixed(self):
+        fnm = self.roundtrip()
+        Wd.set(Wd.workdir, codec="marshal")
+        Cache.clear()
+        obj = Cdc()
+        load(obj, fnm)
+        self.assertEqual(obj.txt, "bla")
+
+    def test_pretty(self):
+        fnm = self.roundtrip()
+        self.assertTrue(raw(fnm).startswith(b"{\n"))
+
+    def test_type(self):
+        Codec.types[kind(Cdc())] = "marshal"
+        fnm = self.roundtrip()
+        self.assertTrue(raw(fnm).startswith(b"\0opm"))
+        self.assertTrue(raw(save(Object())).startswith(b"{"))
+
+
+class TestSqlite(unittest.TestCase):
+
+    def test_json(self):
+        path = os.path.join(Wd.workdir, "cdc")
+        store = Sqlite(path)
+        try:
+            store.codec = "marshal"
+            obj = Object()
+            obj.txt = "bla"
+            fnm = obj.__fnm__
+            store.write(fnm, Codec.get("object", store).encode(vars(obj)))
+            data = store.read(fnm)
+            self.assertTrue(data.startswith(b"{"))
+            self.assertEqual(Codec.decode(data)["txt"], "bla")
+        finally:
+            store.close()
@@ -0,0 +1,37 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"cdir"
+
+
+import os
+import shutil
+import unittest
+
+
+from opr.objects import Object, Wd, cdir, kind, save
+
+
+Wd.workdir = ".test"
+
+
+class Cdr(Object):
+
+    pass
+
+
+class TestCdir(unittest.TestCase):
+
+    def test_known(self):
+        path = os.path.join(Wd.workdir, "cdr", "a", "b")
+        cdir(path)
+        self.assertTrue(os.path.isdir(path))
+        self.assertIn(os.path.abspath(path), cdir.known)
+
+    def test_removed(self):
+        obj = Cdr()
+        save(obj)
+        shutil.rmtree(os.path.join(Wd.workdir, "store", kind(obj)))
+        fnm = save(obj)
+        self.assertTrue(os.path.exists(Wd.getpath(fnm)))
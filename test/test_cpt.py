@@ -0,0 +1,99 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"compaction"
+
+
+import os
+import shutil
+import time
+import unittest
+
+
+from opr.objects import Cache, Object, Wd, find, kind, save
+from opr.storage import compact, compactor
+
+
+CPT = os.path.join(".test", "cpt")
+
+
+def versions(obj, nrs):
+    for nmr in range(nrs):
+        obj.nmr = nmr
+        save(obj)
+
+
+class TestCompact(unittest.TestCase):
+
+    store = "files"
+
+    def setUp(self):
+        if os.path.exists(CPT):
+            shutil.rmtree(CPT)
+        Cache.clear()
+        Wd.set(CPT, self.store)
+
+    def tearDown(self):
+        Wd.opened.pop(CPT).close()
+        Wd.set(".test")
+
+    def test_latest(self):
+        versions(Object(), 5)
+        res = compact()
+        self.assertEqual(res.files, 4)
+        self.assertTrue(res.bytes > 0)
+        self.assertEqual(len(Wd.store().versions(kind(Object()))), 1)
+        self.assertEqual(find("object")[0].nmr, 4)
+
+    def test_compactor(self):
+        versions(Object(), 3)
+        repeater = compactor(0.01)
+        try:
+            for _nr in range(500):
+                if "compacted" in repeater.state:
+                    break
+                time.sleep(0.01)
+        finally:
+            repeater.stop()
+            time.sleep(0.05)
+            repeater.stop()
+        self.assertEqual(repeater.state["compacted"].files, 2)
+
+    def test_keep(self):
+        versions(Object(), 5)
+        self.assertEqual(compact(keep=2).files, 3)
+        self.assertEqual(len(Wd.store().versions(kind(Object()))), 2)
+
+    def test_age(self):
+        versions(Object(), 3)
+        self.assertEqual(compact(age=3600).files, 0)
+
+    def test_deleted(self):
+        obj = Object()
+        versions(obj, 2)
+        obj.__deleted__ = True
+        save(obj)
+        versions(Object(), 1)
+        self.assertEqual(compact(deleted=True).files, 3)
+        self.assertEqual(len(find("object", deleted=False)), 1)
+
+
+class TestCompactSegments(TestCompact):
+
+    store = "segments"
+
+    def test_fds(self):
+        obj = Object()
+        for _nr in range(3):
+            versions(obj, 3)
+            find("object")
+            compact()
+        log = Wd.store().log(kind(obj))
+        self.assertTrue(set(log.fds) <= set(log.segments()))
+        self.assertEqual(find("object")[0].nmr, 2)
+
+
+class TestCompactSqlite(TestCompact):
+
+    store = "sqlite"
@@ -0,0 +1,86 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"database"
+
+
+import os
+import shutil
+import unittest
+
+
+from opr.objects import Cache, Class, Db, Lazy, Object, Wd
+from opr.objects import ifind, kind, match, printable, save
+
+
+Wd.workdir = ".test"
+
+
+class Dbs(Object):
+
+    pass
+
+
+Class.add(Dbs)
+
+
+class TestDb(unittest.TestCase):
+
+    def setUp(self):
+        path = os.path.join(Wd.workdir, "store", kind(Dbs()))
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        for nmr in range(3):
+            obj = Dbs()
+            obj.txt = "test%s" % nmr
+            save(obj)
+
+    def test_find(self):
+        res = Db.find(kind(Dbs()), {"txt": "test1"})
+        self.assertEqual([x.txt for x in res], ["test1"])
+
+    def test_lazy(self):
+        Cache.clear()
+        res = Db.find(kind(Dbs()), deleted=False, lazy=True)
+        self.assertTrue(isinstance(res[0], Lazy))
+        self.assertEqual(Cache.stats().items, 0)
+        self.assertTrue(isinstance(res[0], Dbs))
+        self.assertEqual(printable(res[0], "txt,"), "txt=test0")
+        self.assertEqual(Cache.stats().items, 1)
+
+    def test_lazydefault(self):
+        Cache.clear()
+        res = Db.find(kind(Dbs()), lazy=True)
+        self.assertEqual(len(res), 3)
+        self.assertEqual(Cache.stats().items, 0)
+        self.assertEqual(kind(res[0]), kind(Dbs()))
+
+    def test_workers(self):
+        res = Db.find(kind(Dbs()), workers=4)
+        self.assertEqual([x.txt for x in res], ["test0", "test1", "test2"])
+
+    def test_ifind(self):
+        res = Db.ifind(kind(Dbs()), limit=1, offset=1)
+        self.assertEqual([x.txt for x in res], ["test1"])
+
+    def test_ifindall(self):
+        res = ifind("dbs", limit=2)
+        self.assertEqual([x.txt for x in res], ["test0", "test1"])
+
+    def test_index(self):
+        res = Db.find(kind(Dbs()), index=2)
+        self.assertEqual([x.txt for x in res], ["test2"])
+
+    def test_last(self):
+        self.assertEqual(Db.last(kind(Dbs())).txt, "test2")
+
+    def test_lastselector(self):
+        self.assertEqual(Db.last(kind(Dbs()), {"txt": "test1"}).txt, "test1")
+
+    def test_reverse(self):
+        res = ifind("dbs", reverse=True)
+        self.assertEqual([x.txt for x in res], ["test2", "test1", "test0"])
+
+    def test_match(self):
+        self.assertEqual(match("dbs", {"txt": "test1"}).txt, "test1")
@@ -8,7 +8,7 @@
 import unittest
 
 
-from opr.msg import Event
+from opr.message import Event
 
 
 class TestEvent(unittest.TestCase):
@@ -16,3 +16,29 @@ class TestEvent(unittest.TestCase):
     def testconstructor(self):
         evt = Event()
         self.assertEqual(type(evt), Event)
+
+    def testlazy(self):
+        evt = Event()
+        self.assertNotIn("gets", vars(evt))
+        evt.parse("cmd arg key=value")
+        self.assertEqual(evt.sets.key, "value")
+        self.assertEqual(evt.args, ["arg"])
+        self.assertNotIn("toskip", vars(evt))
+
+    def testready(self):
+        evt = Event()
+        evt.ready()
+        evt.wait()
+        self.assertIsNone(evt.__ready__)
+
+    def testparse(self):
+        evt = Event()
+        evt.parse("cmd -3 -x arg key==value- k==v a=b c=d=e")
+        self.assertEqual(evt.cmd, "cmd")
+        self.assertEqual(evt.index, 3)
+        self.assertEqual(evt.opts, "x")
+        self.assertEqual(vars(evt.gets), {"key": "value", "k": "v"})
+        self.assertEqual(vars(evt.toskip), {"value": ""})
+        self.assertEqual(vars(evt.sets), {"a": "b"})
+        self.assertEqual(evt.args, ["arg", "c=d=e"])
+        self.assertEqual(evt.txt, "cmd arg c=d=e")
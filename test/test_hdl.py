@@ -5,10 +5,44 @@
 "handler"
 
 
+import asyncio
+import threading
+import time
 import unittest
 
 
-from opr.hdl import Handler
+from opr.handler import AsyncHandler, Callback, Command, Handler
+from opr.message import Event
+from opr.threads import launch
+
+
+class Async(AsyncHandler):
+
+    def __init__(self):
+        AsyncHandler.__init__(self)
+        self.res = []
+
+    def raw(self, txt):
+        self.res.append(txt)
+
+
+async def aco(event):
+    await asyncio.sleep(0.01)
+    event.reply("async")
+
+
+def sco(event):
+    event.reply("sync")
+
+
+async def hold(event):
+    await asyncio.sleep(0.1)
+
+
+class Plain(Handler):
+
+    def raw(self, txt):
+        pass
 
 
 class TestHandler(unittest.TestCase):
@@ -16,3 +50,150 @@ class TestHandler(unittest.TestCase):
     def testconstructor(self):
         hdl = Handler()
         self.assertEqual(type(hdl), Handler)
+
+    def testpooled(self):
+        res = []
+        Callback.register("pooled", lambda evt: res.append(evt.txt))
+        Callback.pooled(2, 10)
+        try:
+            evts = []
+            for nmr in range(10):
+                evt = Event()
+                evt.type = "pooled"
+                evt.txt = str(nmr)
+                Callback.callback(evt)
+                evts.append(evt)
+            for evt in evts:
+                evt.wait()
+        finally:
+            Callback.pooled(0)
+        self.assertEqual(len(res), 10)
+        self.assertIsNone(Callback.pool)
+
+    def testpoolederror(self):
+        def fail(evt):
+            raise ValueError(evt.txt)
+        Callback.register("poolerror", fail)
+        Callback.pooled(2)
+        try:
+            evt = Event()
+            evt.type = "poolerror"
+            Callback.callback(evt)
+            evt.wait()
+        finally:
+            Callback.pooled(0)
+        self.assertIn(evt, Callback.errors)
+        self.assertIsInstance(evt.__exc__, ValueError)
+
+    def testasync(self):
+        Command.add(aco)
+        Command.add(sco)
+        hdl = Async()
+        evts = []
+        for txt in ("aco", "sco") * 50:
+            evt = Event()
+            evt.orig = repr(hdl)
+            evt.txt = txt
+            hdl.put(evt)
+            evts.append(evt)
+        thr = launch(hdl.start)
+        for evt in evts:
+            evt.wait()
+        hdl.stop()
+        thr.join()
+        self.assertEqual(sorted(set(hdl.res)), ["async", "sync"])
+        self.assertEqual(len(hdl.res), 100)
+
+    def testawait(self):
+        evt = Event()
+        threading.Timer(0.01, evt.ready).start()
+        self.assertIs(asyncio.run(self.waitfor(evt)), evt)
+
+    def testawaitclosed(self):
+        evt = Event()
+        self.assertRaises(asyncio.TimeoutError, asyncio.run, self.waitfor(evt, 0.01))
+        self.assertIs(asyncio.run(self.waitfor(evt, 1.0, True)), evt)
+
+    @staticmethod
+    async def waitfor(evt, timeout=None, ready=False):
+        if ready:
+            asyncio.get_running_loop().call_later(0.01, evt.ready)
+        if timeout:
+            return await asyncio.wait_for(evt, timeout)
+        return await evt
+
+    def testbound(self):
+        hdl = Async()
+        hdl.bound(2, "oldest")
+        evts = [Event() for _nr in range(3)]
+        for evt in evts:
+            hdl.put(evt)
+        evts[0].wait()
+        self.assertEqual(
+                         hdl.stats(),
+                         {"depth": 2, "dropped": 1, "enqueued": 3, "maxdepth": 2}
+                        )
+
+    def testreject(self):
+        hdl = Async()
+        hdl.bound(1, "reject")
+        evts = []
+        for _nr in range(2):
+            evt = Event()
+            evt.orig = repr(hdl)
+            hdl.put(evt)
+            evts.append(evt)
+        evts[1].wait()
+        self.assertEqual(hdl.res, ["busy, try again later"])
+        self.assertEqual(hdl.stats()["depth"], 1)
+
+    def testboundrunning(self):
+        hdl = Plain()
+        launch(hdl.start)
+        hdl.bound(10, "oldest")
+        evt = Event()
+        hdl.put(evt)
+        evt.wait()
+        self.assertEqual(hdl.stats()["enqueued"], 1)
+
+    def testboundasync(self):
+        Command.add(hold)
+        hdl = Async()
+        hdl.bound(2, "newest")
+        thr = launch(hdl.start)
+        while not hdl.aio:
+            time.sleep(0.001)
+        evts = []
+        for _nr in range(10):
+            evt = Event()
+            evt.txt = "hold"
+            hdl.put(evt)
+            evts.append(evt)
+            self.assertLessEqual(len(hdl.tasks), 2)
+        for evt in evts:
+            evt.wait()
+        hdl.stop()
+        thr.join()
+        stats = hdl.stats()
+        self.assertGreaterEqual(stats["dropped"], 1)
+        self.assertEqual(stats["dropped"] + stats["enqueued"], 10)
+
+    def teststopearly(self):
+        hdl = Async()
+        thr = threading.Thread(target=hdl.start, daemon=True)
+        thr.start()
+        hdl.stop()
+        thr.join(2.0)
+        self.assertFalse(thr.is_alive())
+
+    def testhandle(self):
+        Command.add(aco)
+        Command.add(sco)
+        hdl = Async()
+        for txt in ("aco", "sco"):
+            evt = Event()
+            evt.orig = repr(hdl)
+            evt.parse(txt)
+            hdl.handle(evt)
+            evt.wait()
+        self.assertEqual(hdl.res, ["async", "sync"])
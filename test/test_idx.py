@@ -0,0 +1,85 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"manifest"
+
+
+import os
+import shutil
+import unittest
+
+
+from opr.objects import Object, Wd, cdir, fns, fntime, kind, save
+
+
+Wd.workdir = ".test"
+
+
+class Idx(Object):
+
+    pass
+
+
+def tdir():
+    return os.path.join(Wd.workdir, "store", kind(Idx()))
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        if os.path.exists(tdir()):
+            shutil.rmtree(tdir())
+
+    def test_fns(self):
+        obj = Idx()
+        save(obj)
+        save(Idx())
+        self.assertEqual(len(fns(kind(obj))), 2)
+        self.assertTrue(os.path.exists(os.path.join(tdir(), ".manifest")))
+
+    def test_latest(self):
+        obj = Idx()
+        save(obj)
+        fnm = save(obj)
+        self.assertEqual(fns(kind(obj)), [Wd.getpath(fnm)])
+
+    def test_missing(self):
+        obj = Idx()
+        fnm = save(obj)
+        os.unlink(os.path.join(tdir(), ".manifest"))
+        self.assertEqual(fns(kind(obj)), [Wd.getpath(fnm)])
+
+    def test_stale(self):
+        save(Idx())
+        obj = Idx()
+        opath = Wd.getpath(obj.__fnm__)
+        cdir(opath)
+        with open(opath, "w", encoding="utf-8") as ofile:
+            ofile.write("{}")
+        mpath = os.path.join(tdir(), ".manifest")
+        stt = os.stat(mpath)
+        os.utime(mpath, ns=(stt.st_atime_ns, stt.st_mtime_ns - 10**9))
+        self.assertEqual(len(fns(kind(obj))), 2)
+
+    def test_timed(self):
+        for _nr in range(3):
+            save(Idx())
+        pths = fns(kind(Idx()))
+        timed = Object()
+        setattr(timed, "from", fntime(pths[1]))
+        timed.to = fntime(pths[1])
+        self.assertEqual(fns(kind(Idx()), timed), pths[1:2])
+        timed.to = None
+        self.assertEqual(fns(kind(Idx()), timed), pths[1:])
+
+    def test_rebuild(self):
+        for _nr in range(10):
+            save(Idx())
+        pths = fns(kind(Idx()))
+        mpath = os.path.join(tdir(), ".manifest")
+        os.unlink(mpath)
+        self.assertEqual(fns(kind(Idx())), pths)
+        with open(mpath, "r", encoding="utf-8") as ifile:
+            lines = ifile.read().splitlines()
+        self.assertEqual([Wd.getpath(x) for x in lines], pths)
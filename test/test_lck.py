@@ -0,0 +1,119 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"locking"
+
+
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import threading
+import time
+import unittest
+
+
+from opr.objects import Cache, Object, Wd, find, load, save, write
+from opr.storage import compact
+
+
+LCK = os.path.join(".test", "lck")
+
+
+def saver():
+    Wd.set(LCK)
+    obj = Object()
+    while 1:
+        obj.txt = "x" * 100000
+        write(obj)
+
+
+def tmps():
+    res = []
+    for _rootdir, _dirs, fls in os.walk(os.path.join(LCK, "store")):
+        res.extend(x for x in fls if x.endswith(".tmp"))
+    return res
+
+
+class TestLocking(unittest.TestCase):
+
+    def setUp(self):
+        if os.path.exists(LCK):
+            shutil.rmtree(LCK)
+        Wd.set(LCK, "files")
+
+    def tearDown(self):
+        Wd.opened.pop(LCK).close()
+        Wd.set(".test")
+
+    def test_stress(self):
+        shared = Object()
+        shared.txt = "x" * 10000
+        write(shared)
+        errors = []
+
+        def writer():
+            try:
+                obj = Object()
+                for nmr in range(50):
+                    obj.nmr = nmr
+                    save(obj)
+                    shared.nmr = nmr
+                    write(shared)
+            except Exception as ex: # pylint: disable=W0703
+                errors.append(ex)
+
+        def reader():
+            try:
+                for _nr in range(50):
+                    Cache.clear()
+                    obj = Object()
+                    load(obj, shared.__fnm__)
+                    assert obj.txt == shared.txt
+                    find("object")
+            except Exception as ex: # pylint: disable=W0703
+                errors.append(ex)
+
+        thrs = [threading.Thread(target=x) for x in (writer, reader) * 4]
+        for thr in thrs:
+            thr.start()
+        for thr in thrs:
+            thr.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(find("object")), 5)
+        self.assertEqual([x.nmr for x in find("object")], [49] * 5)
+
+    def test_failed(self):
+        obj = Object()
+        self.assertRaises(TypeError, Wd.store().write, obj.__fnm__, "text")
+        self.assertEqual(tmps(), [])
+
+    def test_kill(self):
+        Wd.store()
+        proc = multiprocessing.get_context("spawn").Process(target=saver)
+        proc.start()
+        time.sleep(1.0)
+        os.kill(proc.pid, signal.SIGKILL)
+        proc.join()
+        nmr = 0
+        for rootdir, _dirs, fls in os.walk(os.path.join(LCK, "store")):
+            for fnm in fls:
+                if fnm.startswith("."):
+                    continue
+                with open(os.path.join(rootdir, fnm), "r", encoding="utf-8") as ifile:
+                    json.load(ifile)
+                nmr += 1
+        self.assertEqual(nmr, 1)
+        compact()
+        self.assertEqual(tmps(), [])
+
+    def test_sweep(self):
+        fnm = save(Object())
+        ddd, fname = os.path.split(Wd.getpath(fnm))
+        for pid in (os.getpid(), 99999999):
+            with open(os.path.join(ddd, ".%s.%s.tmp" % (fname, pid)), "wb") as ofile:
+                ofile.write(b"{")
+        self.assertEqual(compact().bytes, 1)
+        self.assertEqual(tmps(), [".%s.%s.tmp" % (fname, os.getpid())])
@@ -10,10 +10,10 @@ import os
 import unittest
 
 
-from opr.obj import Object, Wd, items, keys, register, update, values
-from opr.obj import edit, kind, load, save
-from opr.obj import ObjectDecoder, ObjectEncoder
-from opr.obj import printable
+from opr.objects import Default, Object, Wd, items, keys, register, update, values
+from opr.objects import edit, kind, load, save
+from opr.objects import ObjectDecoder, ObjectEncoder
+from opr.objects import printable
 
 
 Wd.workdir = ".test"
@@ -52,6 +52,7 @@ attrs2 = (
           '__fnm__',
           '__format__',
           '__ge__',
+          '__getattr__',
           '__getattribute__',
           '__getitem__',
           '__gt__',
@@ -121,6 +122,14 @@ class TestObject(unittest.TestCase):
         obj = Object()
         self.assertEqual(obj.__doc__, None)
 
+    def test_fnm(self):
+        obj = Object()
+        self.assertRaises(AttributeError, Object.__fnm__.__get__, obj)
+        fnm = obj.__fnm__
+        self.assertEqual(fnm.split(os.sep)[0], kind(obj))
+        self.assertEqual(obj.__fnm__, fnm)
+        self.assertEqual(len(Default().__fnm__.split(os.sep)), 4)
+
     def test_format(self):
         obj = Object()
         self.assertEqual(obj.__format__(""), "{}")
@@ -157,7 +166,7 @@ class TestObject(unittest.TestCase):
         self.assertTrue(Object().__module__, "op")
 
     def test_kind(self):
-        self.assertEqual(kind(Object()), "opr.obj.Object")
+        self.assertEqual(kind(Object()), "opr.objects.Object")
 
     def test_repr(self):
         self.assertTrue(update(Object(),
@@ -5,13 +5,15 @@
 "path"
 
 
+import time
 import unittest
 
 
-from opr.obj import fntime
+from opr.objects import fntime
 
 
 FN = "opr.handler.Event/2d390009cef944e68ce686e5709a54d7/2022-04-11/22:40:31.259218"
+FNW = "opr.handler.Event/2d390009cef944e68ce686e5709a54d7/2022-04-11/22:40:31"
 
 
 class TestPath(unittest.TestCase):
@@ -19,3 +21,10 @@ class TestPath(unittest.TestCase):
     def test_path(self):
         fnt = fntime(FN)
         self.assertEqual(fnt, 1649709631.259218)
+
+    def test_strptime(self):
+        tme = time.mktime(time.strptime("2022-04-11 22:40:31", "%Y-%m-%d %H:%M:%S"))
+        self.assertEqual(fntime(FN), tme + 0.259218)
+
+    def test_whole(self):
+        self.assertAlmostEqual(fntime(FNW), fntime(FN) - 0.259218)
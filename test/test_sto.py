@@ -0,0 +1,171 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"storage"
+
+
+import os
+import shutil
+import unittest
+
+
+from opr.objects import Cache, Object, Wd, find, fntime, kind, last, load, save
+from opr.objects import Class, Db, Default
+from opr.message import Event
+from opr.storage import Segments, Sqlite, mig, migrate
+
+
+SEG = os.path.join(".test", "seg")
+SQL = os.path.join(".test", "sql")
+
+
+class Feed(Default):
+
+    rss = "http://example"
+
+
+Class.add(Feed)
+
+
+class TestSegments(unittest.TestCase):
+
+    def setUp(self):
+        if os.path.exists(SEG):
+            shutil.rmtree(SEG)
+        Cache.clear()
+        Wd.set(SEG, "segments")
+
+    def tearDown(self):
+        Wd.opened.pop(SEG).close()
+        Wd.set(".test")
+
+    def test_load(self):
+        obj = Object()
+        obj.key = "value"
+        fnm = save(obj)
+        Cache.clear()
+        oobj = Object()
+        load(oobj, fnm)
+        self.assertEqual(oobj.key, "value")
+
+    def test_last(self):
+        obj = Object()
+        obj.key = "one"
+        save(obj)
+        obj.key = "two"
+        save(obj)
+        oobj = Object()
+        last(oobj)
+        self.assertEqual(oobj.key, "two")
+        self.assertEqual(len(find("object")), 1)
+
+    def test_retry(self):
+        obj = Object()
+        obj.key = "value"
+        fnm = save(obj)
+        Cache.clear()
+        store = Wd.store()
+        reads = []
+        def torn(path):
+            reads.append(path)
+            if len(reads) == 1:
+                return b"{not json"
+            return Segments.read(store, path)
+        store.read = torn
+        try:
+            oobj = Object()
+            load(oobj, fnm)
+        finally:
+            del store.read
+        self.assertEqual(oobj.key, "value")
+        self.assertEqual(len(reads), 2)
+
+    def test_torn(self):
+        save(Object())
+        seg = os.path.join(SEG, "segments", kind(Object()), "00000000.seg")
+        with open(seg, "ab") as ofile:
+            ofile.write(b"\x40\x00\x00\x00broken")
+        save(Object())
+        store = Segments(SEG)
+        self.assertEqual(len(list(store.fns(kind(Object())))), 2)
+
+    def test_migrate(self):
+        Wd.set(SEG, "files")
+        for nmr in range(3):
+            obj = Object()
+            obj.nmr = nmr
+            save(obj)
+        store = Segments(SEG)
+        self.assertEqual(migrate(Wd.store(), store), 3)
+        Wd.set(SEG, "segments")
+        self.assertEqual([x.nmr for x in find("object")], [0, 1, 2])
+
+    def test_mig(self):
+        path = os.path.join(SEG, "fresh")
+        Wd.set(path, "files")
+        evt = Event()
+        evt.args = ["segments"]
+        try:
+            mig(evt)
+            with open(os.path.join(path, "storage"), encoding="utf-8") as ifile:
+                self.assertEqual(ifile.read(), "segments\n")
+        finally:
+            Wd.opened.pop(path).close()
+
+
+class TestSqlite(unittest.TestCase):
+
+    def setUp(self):
+        if os.path.exists(SQL):
+            shutil.rmtree(SQL)
+        Cache.clear()
+        Wd.set(SQL, "sqlite")
+        for nmr in range(3):
+            obj = Object()
+            obj.txt = "test%s" % nmr
+            obj.nmr = nmr
+            save(obj)
+
+    def tearDown(self):
+        Wd.opened.pop(SQL).close()
+        Wd.set(".test")
+
+    def test_find(self):
+        self.assertEqual([x.txt for x in find("object")], ["test0", "test1", "test2"])
+
+    def test_last(self):
+        obj = Db.last(kind(Object()))
+        obj.txt = "test3"
+        save(obj)
+        self.assertEqual(Db.last(kind(Object())).txt, "test3")
+        self.assertEqual(len(find("object")), 3)
+
+    def test_selector(self):
+        self.assertEqual([x.txt for x in find("object", {"txt": "test1"})], ["test1"])
+        self.assertEqual([x.nmr for x in find("object", {"nmr": "2"})], [2])
+
+    def test_selectorclass(self):
+        feed = Feed()
+        feed.txt = "x"
+        save(feed)
+        self.assertEqual([x.txt for x in Db.find(kind(feed), {"rss": "example"})], ["x"])
+
+    def test_selectorobject(self):
+        sel = Default()
+        sel.txt = "test1"
+        self.assertEqual([x.txt for x in find("object", sel)], ["test1"])
+        self.assertEqual([x.txt for x in find("object", Object(txt="test2"))], ["test2"])
+
+    def test_timed(self):
+        fnms = list(Wd.store().fns(kind(Object())))
+        timed = Object()
+        setattr(timed, "from", fntime(fnms[1]))
+        self.assertEqual([x.txt for x in find("object", timed=timed)], ["test1", "test2"])
+
+    def test_migrate(self):
+        store = Sqlite(SQL)
+        store.dbpath = os.path.join(SQL, "copy.db")
+        self.assertEqual(migrate(Wd.store(), store), 3)
+        self.assertEqual(len(list(store.fns(kind(Object())))), 3)
+        store.close()
@@ -5,10 +5,12 @@
 "threads"
 
 
+import queue
+import threading
 import unittest
 
 
-from opr.thr import Thread
+from opr.threads import Bounded, Pool, Thread
 
 
 def test():
@@ -20,3 +22,69 @@ class TestThread(unittest.TestCase):
     def test_thread(self):
         thr = Thread(test, "test")
         self.assertEqual(type(thr), Thread)
+
+
+class TestPool(unittest.TestCase):
+
+    def test_pool(self):
+        res = []
+        pool = Pool(2, 10)
+        for nmr in range(20):
+            pool.put(res.append, nmr)
+        pool.stop()
+        self.assertEqual(sorted(res), list(range(20)))
+        self.assertEqual(pool.threads, [])
+
+    def test_error(self):
+        pool = Pool(1)
+        pool.put(int, "x")
+        pool.stop()
+        self.assertEqual(len(pool.errors), 1)
+
+
+class TestBounded(unittest.TestCase):
+
+    def test_block(self):
+        bqu = Bounded(2)
+        bqu.put(1)
+        bqu.put(2)
+        thr = threading.Thread(target=bqu.put, args=(3,))
+        thr.start()
+        self.assertEqual(bqu.get(), 1)
+        thr.join()
+        self.assertEqual([bqu.get(), bqu.get()], [2, 3])
+
+    def test_close(self):
+        bqu = Bounded()
+        bqu.put(1)
+        bqu.close()
+        self.assertFalse(bqu.put(2))
+        self.assertEqual(bqu.get(), 1)
+        self.assertIsNone(bqu.get())
+
+    def test_newest(self):
+        bqu = Bounded(2, "newest")
+        res = [bqu.put(x) for x in range(4)]
+        self.assertEqual(res, [True, True, False, False])
+        self.assertEqual([bqu.get(), bqu.get()], [0, 1])
+        self.assertEqual(bqu.stats()["dropped"], 2)
+
+    def test_ondrop(self):
+        res = []
+        bqu = Bounded(1, "oldest", res.append)
+        for nmr in range(3):
+            bqu.put(nmr)
+        self.assertEqual(res, [0, 1])
+
+    def test_oldest(self):
+        bqu = Bounded(2, "oldest")
+        for nmr in range(4):
+            bqu.put(nmr)
+        self.assertEqual([bqu.get(), bqu.get()], [2, 3])
+        self.assertEqual(
+                         bqu.stats(),
+                         {"depth": 0, "dropped": 2, "enqueued": 4, "maxdepth": 2}
+                        )
+
+    def test_timeout(self):
+        self.assertRaises(queue.Empty, Bounded().get, 0.01)
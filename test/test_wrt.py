@@ -0,0 +1,86 @@
+# This file is placed in the Public Domain.
+# pylint: disable=C0115,C0116
+
+
+"write-behind"
+
+
+import os
+import unittest
+
+
+from opr.handler import Handler
+from opr.objects import Cache, Db, Object, Wd, Writer, kind, load, save
+
+
+Wd.workdir = ".test"
+
+
+class Wrt(Object):
+
+    pass
+
+
+class TestWriter(unittest.TestCase):
+
+    def setUp(self):
+        Writer.start()
+
+    def tearDown(self):
+        Writer.stop()
+        Cache.clear()
+
+    def test_find(self):
+        nrs = len(Db.find(kind(Wrt())))
+        for _nr in range(10):
+            save(Wrt())
+        self.assertEqual(len(Db.find(kind(Wrt()))), nrs + 10)
+
+    def test_flush(self):
+        fnm = save(Wrt())
+        Writer.flush()
+        self.assertTrue(os.path.exists(Wd.getpath(fnm)))
+
+    def test_load(self):
+        obj = Wrt()
+        obj.txt = "bla"
+        fnm = save(obj)
+        oobj = Wrt()
+        load(oobj, fnm)
+        self.assertEqual(oobj.txt, "bla")
+
+    def test_errors(self):
+        store = Wd.store()
+        def fail(items):
+            raise OSError("disk full")
+        store.writemany = fail
+        try:
+            save(Wrt())
+            self.assertRaises(OSError, Writer.flush)
+        finally:
+            del store.writemany
+        Writer.flush()
+
+    def test_owners(self):
+        hdl = Handler()
+        hdl.writebehind()
+        hdl.stop()
+        self.assertIsNotNone(Writer.thread)
+        Writer.stop()
+        self.assertIsNone(Writer.thread)
+        hdl.loop = lambda: None
+        hdl.start()
+        self.assertIsNotNone(Writer.thread)
+        hdl.stop()
+        self.assertIsNone(Writer.thread)
+
+    def test_stop(self):
+        hdl = Handler()
+        hdl.writebehind()
+        fnms = [save(Wrt()) for _nr in range(10)]
+        Writer.stop()
+        hdl.stop()
+        self.assertIsNone(Writer.thread)
+        self.assertTrue(all(os.path.exists(Wd.getpath(x)) for x in fnms))
+        fnm = save(Wrt())
+        self.assertTrue(os.path.exists(Wd.getpath(fnm)))